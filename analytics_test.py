@@ -1,45 +1,138 @@
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import logging
 import time
 from datetime import datetime
-import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import os
+import sys
+import threading
+import uuid
+import pytest
+
+logger = logging.getLogger("analytics_test")
+# Each thread queues its own lines, so tests running concurrently in gather() don't interleave
+output = threading.local()
+
+def configure_logging(level=logging.INFO):
+    """Send suite output to stdout through a single handler, message text only"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+def log(message=""):
+    """Queue a line of output for this thread; its lines are written together at the next flush"""
+    if not hasattr(output, "lines"):
+        output.lines = []
+    output.lines.append(message)
+
+def flush_output():
+    """Emit this thread's queued output as one log record"""
+    lines = getattr(output, "lines", None)
+    if lines:
+        logger.info("\n".join(lines))
+        lines.clear()
+
+def run_and_flush(call):
+    """Run a zero-argument call in a worker thread and write out whatever it logged"""
+    try:
+        return call()
+    finally:
+        flush_output()
 
 class AnalyticsEndpointTester:
-    def __init__(self, base_url="https://c624a4bd-9719-44d8-8b44-e52e7972801c.preview.emergentagent.com"):
+    _TYPE_SPEC = (
+        ('total_suggestions', int),
+        ('successful_suggestions', int),
+        ('avg_confidence', float),
+        ('avg_processing_time', float),
+        ('total_merge_requests', int),
+        ('successful_merge_requests', int),
+        ('usage_by_day', dict),
+        ('top_ticket_types', list),
+    )
+    _REQUIRED_FIELDS = frozenset(field for field, _ in _TYPE_SPEC)
+    # Ratios a mocked analytics implementation would derive from total_suggestions
+    _MOCK_RATIOS = (
+        ('successful_suggestions', 0.85),
+        ('total_merge_requests', 0.6),
+        ('successful_merge_requests', 0.45),
+    )
+    # Below this many suggestions a real count lands on a mock ratio by chance too easily
+    _MOCK_MIN_TOTAL = 20
+    # Allowed distance from a mock value, so int()/ceil() variants of the ratio are caught too
+    _MOCK_TOLERANCE = 1
+    _UNIMPLEMENTED_FIELDS = ('total_merge_requests', 'successful_merge_requests')
+
+    def __init__(self, base_url="https://c624a4bd-9719-44d8-8b44-e52e7972801c.preview.emergentagent.com", timeout=(3.05, 90)):
         self.base_url = base_url
+        # (connect, read) seconds; the read budget covers a full OLLAMA generation in suggest/code
+        self.timeout = timeout
         self.api_url = f"{self.base_url}/api"
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        # Retry transient gateway errors and dropped connections with exponential backoff.
+        # Only idempotent methods are retried so a flaky POST never creates a duplicate suggestion.
+        retries = Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+        self.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retries))
+
+    def close(self):
+        """Close the underlying HTTP session"""
+        self.session.close()
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, params=None):
+    def gather(self, *calls):
+        """Run independent zero-argument calls concurrently and return their results in order"""
+        with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+            return list(pool.map(run_and_flush, calls))
+
+    def invalidate_cache(self):
+        """Drop all cached GET responses"""
+        self._cache.clear()
+
+    def run_test(self, name, method, endpoint, expected_status, data=None, params=None, use_cache=True):
         """Run a single API test"""
         url = f"{self.api_url}/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
+        cache_key = (method, endpoint, frozenset((params or {}).items()))
+        if method == 'GET' and use_cache and cache_key in self._cache:
+            log(f"\n♻️ Reusing cached response for {name}")
+            flush_output()
+            return self._cache[cache_key]
         
-        self.tests_run += 1
-        print(f"\n🔍 Testing {name}...")
+        with self._lock:
+            self.tests_run += 1
+        log(f"\n🔍 Testing {name}...")
         
         try:
-            start_time = time.time()
+            start_time = time.perf_counter()
             if method == 'GET':
-                response = requests.get(url, headers=headers, params=params)
+                response = self.session.get(url, params=params, timeout=self.timeout)
             elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, params=params)
+                response = self.session.post(url, json=data, params=params, timeout=self.timeout)
             
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.perf_counter() - start_time
             
             success = response.status_code == expected_status
             if success:
-                self.tests_passed += 1
+                with self._lock:
+                    self.tests_passed += 1
                 result = {
                     "name": name,
                     "status": "PASS",
                     "response_time": f"{elapsed_time:.2f}s",
                     "status_code": response.status_code
                 }
-                print(f"✅ Passed - Status: {response.status_code} - Time: {elapsed_time:.2f}s")
+                log(f"✅ Passed - Status: {response.status_code} - Time: {elapsed_time:.2f}s")
             else:
                 result = {
                     "name": name,
@@ -48,192 +141,238 @@ class AnalyticsEndpointTester:
                     "status_code": response.status_code,
                     "expected_status": expected_status
                 }
-                print(f"❌ Failed - Expected {expected_status}, got {response.status_code} - Time: {elapsed_time:.2f}s")
+                log(f"❌ Failed - Expected {expected_status}, got {response.status_code} - Time: {elapsed_time:.2f}s")
             
             try:
-                result["response"] = response.json()
+                parsed = orjson.loads(response.content)
+                result["response"] = parsed
             except:
-                result["response"] = response.text
+                parsed = None
+                # Keep a bounded UTF-8 preview of non-JSON bodies (e.g. HTML error pages)
+                result["response"] = response.content[:2048].decode("utf-8", "replace")
                 
             self.test_results.append(result)
-            return success, response
+            if method == 'GET' and success:
+                self._cache[cache_key] = (success, response, parsed)
+            elif method != 'GET' and success:
+                # Writes change server-side state, so earlier reads are stale
+                self.invalidate_cache()
+            return success, response, parsed
         except Exception as e:
             self.test_results.append({
                 "name": name,
                 "status": "ERROR",
                 "error": str(e)
             })
-            print(f"❌ Error - {str(e)}")
-            return False, None
+            log(f"❌ Error - {str(e)}")
+            return False, None, None
+        finally:
+            flush_output()
 
-    def get_analytics(self):
+    def get_analytics(self, use_cache=True):
         """Get analytics data from the API"""
-        success, response = self.run_test(
+        success, response, analytics = self.run_test(
             "Get Analytics Data",
             "GET",
             "analytics",
-            200
+            200,
+            use_cache=use_cache
         )
         if success:
-            return response.json()
+            return analytics
         return None
 
     def create_test_suggestion(self, confidence_score=0.7):
         """Create a test suggestion with specified confidence score"""
-        test_ticket_id = f"TEST-{int(time.time())}-{random.randint(1000, 9999)}"
+        test_ticket_id = f"TEST-{uuid.uuid4().hex[:12]}"
         
         # First, we need to create a suggestion
-        success, response = self.run_test(
+        success, response, suggestion = self.run_test(
             f"Create Test Suggestion (confidence: {confidence_score})",
             "POST",
             "suggest/code",
             200,
-            data={"ticket_id": test_ticket_id}
+            data={"ticket_id": test_ticket_id},
+            # Stored before the response, so analytics read afterwards already count it
+            params={"sync": "true"}
         )
         
         if not success:
-            print("❌ Failed to create test suggestion")
+            log("❌ Failed to create test suggestion")
             return None
             
         # The API doesn't allow setting confidence directly, so we'll just return the created suggestion
-        return response.json()
+        return suggestion
 
-    def verify_analytics_data_types(self, analytics):
+    def create_test_suggestions(self, *confidence_groups):
+        """Create one suggestion per confidence score in a single concurrent batch.
+
+        Returns the successfully created suggestions, grouped the same way as the input.
+        """
+        scores = [score for group in confidence_groups for score in group]
+        created = self.gather(*(partial(self.create_test_suggestion, confidence_score=score) for score in scores))
+        
+        grouped, offset = [], 0
+        for group in confidence_groups:
+            grouped.append([s for s in created[offset:offset + len(group)] if s])
+            offset += len(group)
+        return grouped
+
+    @classmethod
+    def verify_analytics_data_types(cls, analytics):
         """Verify that analytics data has the correct types"""
-        print("\n🔍 Verifying analytics data types...")
+        log("\n🔍 Verifying analytics data types...")
         
         # Check required fields
-        required_fields = [
-            'total_suggestions', 'successful_suggestions', 'avg_confidence', 
-            'avg_processing_time', 'total_merge_requests', 'successful_merge_requests',
-            'usage_by_day', 'top_ticket_types'
-        ]
-        
-        missing_fields = [field for field in required_fields if field not in analytics]
+        missing_fields = cls._REQUIRED_FIELDS - analytics.keys()
         if missing_fields:
-            print(f"❌ Missing required fields in analytics response: {missing_fields}")
+            log(f"❌ Missing required fields in analytics response: {sorted(missing_fields)}")
             return False
         
-        print("✅ All required fields present in analytics response")
+        log("✅ All required fields present in analytics response")
         
         # Verify data types
-        type_checks = [
-            (analytics['total_suggestions'], int, 'total_suggestions'),
-            (analytics['successful_suggestions'], int, 'successful_suggestions'),
-            (analytics['avg_confidence'], float, 'avg_confidence'),
-            (analytics['avg_processing_time'], float, 'avg_processing_time'),
-            (analytics['total_merge_requests'], int, 'total_merge_requests'),
-            (analytics['successful_merge_requests'], int, 'successful_merge_requests'),
-            (analytics['usage_by_day'], dict, 'usage_by_day'),
-            (analytics['top_ticket_types'], list, 'top_ticket_types')
-        ]
-        
         all_types_correct = True
-        for value, expected_type, field_name in type_checks:
+        for field_name, expected_type in cls._TYPE_SPEC:
+            value = analytics[field_name]
             if not isinstance(value, expected_type):
-                print(f"❌ {field_name} should be {expected_type.__name__}, got {type(value).__name__}")
+                log(f"❌ {field_name} should be {expected_type.__name__}, got {type(value).__name__}")
                 all_types_correct = False
         
         if all_types_correct:
-            print("✅ All data types are correct in analytics response")
+            log("✅ All data types are correct in analytics response")
             return True
         return False
 
-    def verify_no_mock_calculations(self, analytics, total_suggestions):
+    @classmethod
+    def verify_no_mock_calculations(cls, analytics, total_suggestions):
         """Verify that no mock calculations are used"""
-        print("\n🔍 Verifying no mock calculations are used...")
-        
-        # Check if successful_suggestions is NOT calculated as 85% of total
-        mock_successful = round(total_suggestions * 0.85)
-        if analytics['successful_suggestions'] == mock_successful and total_suggestions > 0:
-            print(f"❌ successful_suggestions appears to be using mock 85% calculation: {analytics['successful_suggestions']} = {total_suggestions} * 0.85")
-            return False
-        
-        # Check if total_merge_requests is NOT calculated as 60% of total
-        mock_total_mr = round(total_suggestions * 0.6)
-        if analytics['total_merge_requests'] == mock_total_mr and total_suggestions > 0:
-            print(f"❌ total_merge_requests appears to be using mock 60% calculation: {analytics['total_merge_requests']} = {total_suggestions} * 0.6")
-            return False
-        
-        # Check if successful_merge_requests is NOT calculated as 45% of total
-        mock_successful_mr = round(total_suggestions * 0.45)
-        if analytics['successful_merge_requests'] == mock_successful_mr and total_suggestions > 0:
-            print(f"❌ successful_merge_requests appears to be using mock 45% calculation: {analytics['successful_merge_requests']} = {total_suggestions} * 0.45")
-            return False
+        log("\n🔍 Verifying no mock calculations are used...")
+        
+        # Check that no field is derived as a fixed percentage of the total
+        if total_suggestions >= cls._MOCK_MIN_TOTAL:
+            for field, ratio in cls._MOCK_RATIOS:
+                mock_value = round(total_suggestions * ratio)
+                if abs(analytics[field] - mock_value) <= cls._MOCK_TOLERANCE:
+                    log(f"❌ {field} appears to be using mock {ratio:.0%} calculation: {analytics[field]} ≈ {total_suggestions} * {ratio}")
+                    return False
+        else:
+            log(f"   Skipping mock ratio checks: only {total_suggestions} suggestions (need {cls._MOCK_MIN_TOTAL})")
         
         # Verify merge requests are 0 (since they're not implemented)
-        if analytics['total_merge_requests'] != 0:
-            print(f"❌ total_merge_requests should be 0, got {analytics['total_merge_requests']}")
-            return False
-            
-        if analytics['successful_merge_requests'] != 0:
-            print(f"❌ successful_merge_requests should be 0, got {analytics['successful_merge_requests']}")
-            return False
+        for field in cls._UNIMPLEMENTED_FIELDS:
+            if analytics[field] != 0:
+                log(f"❌ {field} should be 0, got {analytics[field]}")
+                return False
         
-        print("✅ No mock calculations detected")
+        log("✅ No mock calculations detected")
         return True
 
     def verify_analytics_values(self, analytics, expected_total, expected_successful):
         """Verify that analytics values are calculated correctly"""
-        print("\n🔍 Verifying analytics values...")
+        log("\n🔍 Verifying analytics values...")
         
         # Check total_suggestions
         if analytics['total_suggestions'] != expected_total:
-            print(f"❌ total_suggestions should be {expected_total}, got {analytics['total_suggestions']}")
+            log(f"❌ total_suggestions should be {expected_total}, got {analytics['total_suggestions']}")
             return False
         
-        print(f"✅ total_suggestions is correct: {analytics['total_suggestions']}")
+        log(f"✅ total_suggestions is correct: {analytics['total_suggestions']}")
         
         # Check successful_suggestions
         if analytics['successful_suggestions'] != expected_successful:
-            print(f"❌ successful_suggestions should be {expected_successful}, got {analytics['successful_suggestions']}")
+            log(f"❌ successful_suggestions should be {expected_successful}, got {analytics['successful_suggestions']}")
             return False
         
-        print(f"✅ successful_suggestions is correct: {analytics['successful_suggestions']}")
+        log(f"✅ successful_suggestions is correct: {analytics['successful_suggestions']}")
         
+        return self.verify_analytics_ranges(analytics)
+
+    @classmethod
+    def verify_analytics_ranges(cls, analytics):
+        """Verify that averages are reported in the expected units"""
         # Check avg_confidence is in percentage form (0-100)
         if not (0 <= analytics['avg_confidence'] <= 100):
-            print(f"❌ avg_confidence should be in range 0-100, got {analytics['avg_confidence']}")
+            log(f"❌ avg_confidence should be in range 0-100, got {analytics['avg_confidence']}")
             return False
         
-        print(f"✅ avg_confidence is in correct range: {analytics['avg_confidence']}%")
+        log(f"✅ avg_confidence is in correct range: {analytics['avg_confidence']}%")
         
         # Check avg_processing_time is in seconds (not milliseconds)
         # Typical processing times should be under 60 seconds
         if not (0 <= analytics['avg_processing_time'] < 60):
-            print(f"❌ avg_processing_time should be in seconds (0-60), got {analytics['avg_processing_time']}")
+            log(f"❌ avg_processing_time should be in seconds (0-60), got {analytics['avg_processing_time']}")
             return False
         
-        print(f"✅ avg_processing_time is in correct range: {analytics['avg_processing_time']}s")
+        log(f"✅ avg_processing_time is in correct range: {analytics['avg_processing_time']}s")
+        
+        return True
+
+    @classmethod
+    def verify_analytics_formats(cls, analytics):
+        """Verify the structure of top_ticket_types entries and usage_by_day keys"""
+        log("\n🔍 Verifying data formats...")
+        
+        # If there are ticket types, verify their structure
+        for ticket_type in analytics['top_ticket_types']:
+            if not isinstance(ticket_type, dict) or 'type' not in ticket_type or 'count' not in ticket_type:
+                log(f"❌ Invalid ticket type format: {ticket_type}")
+                return False
+        
+        if analytics['top_ticket_types']:
+            log(f"✅ top_ticket_types has valid format with {len(analytics['top_ticket_types'])} types")
+        else:
+            log("✅ top_ticket_types is empty (valid for no categorized tickets)")
+        
+        # If there is usage data, verify it has valid dates as keys
+        for date, count in analytics['usage_by_day'].items():
+            # Check if date is in YYYY-MM-DD format
+            try:
+                datetime.strptime(date, '%Y-%m-%d')
+            except ValueError:
+                log(f"❌ Invalid date format in usage_by_day: {date}")
+                return False
+            
+            if not isinstance(count, int) or count < 0:
+                log(f"❌ Invalid count for date {date}: {count}")
+                return False
+        
+        if analytics['usage_by_day']:
+            log(f"✅ usage_by_day has valid format with {len(analytics['usage_by_day'])} days")
+        else:
+            log("✅ usage_by_day is empty (valid for no usage data)")
         
         return True
 
     def run_analytics_tests(self):
         """Run comprehensive tests on the analytics endpoint"""
-        print("\n" + "="*50)
-        print("🧪 ANALYTICS ENDPOINT TESTING")
-        print("="*50)
+        log("\n" + "="*50)
+        log("🧪 ANALYTICS ENDPOINT TESTING")
+        log("="*50)
         
         # Get initial analytics
         initial_analytics = self.get_analytics()
         if not initial_analytics:
-            print("❌ Failed to get initial analytics")
+            log("❌ Failed to get initial analytics")
             return False
         
-        print("\n📊 Initial Analytics Data:")
-        print(f"Total Suggestions: {initial_analytics['total_suggestions']}")
-        print(f"Successful Suggestions: {initial_analytics['successful_suggestions']}")
-        print(f"Avg Confidence: {initial_analytics['avg_confidence']}%")
-        print(f"Avg Processing Time: {initial_analytics['avg_processing_time']}s")
-        print(f"Total Merge Requests: {initial_analytics['total_merge_requests']}")
-        print(f"Successful Merge Requests: {initial_analytics['successful_merge_requests']}")
-        print(f"Usage by Day: {json.dumps(initial_analytics['usage_by_day'], indent=2)}")
-        print(f"Top Ticket Types: {json.dumps(initial_analytics['top_ticket_types'], indent=2)}")
-        
-        # Verify data types
+        log("\n📊 Initial Analytics Data:")
+        log(f"Total Suggestions: {initial_analytics['total_suggestions']}")
+        log(f"Successful Suggestions: {initial_analytics['successful_suggestions']}")
+        log(f"Avg Confidence: {initial_analytics['avg_confidence']}%")
+        log(f"Avg Processing Time: {initial_analytics['avg_processing_time']}s")
+        log(f"Total Merge Requests: {initial_analytics['total_merge_requests']}")
+        log(f"Successful Merge Requests: {initial_analytics['successful_merge_requests']}")
+        log(f"Usage by Day: {orjson.dumps(initial_analytics['usage_by_day'], option=orjson.OPT_INDENT_2).decode()}")
+        log(f"Top Ticket Types: {orjson.dumps(initial_analytics['top_ticket_types'], option=orjson.OPT_INDENT_2).decode()}")
+        
+        # Verify data types and formats
         if not self.verify_analytics_data_types(initial_analytics):
             return False
         
+        if not self.verify_analytics_formats(initial_analytics):
+            return False
+        
         # Verify no mock calculations
         if not self.verify_no_mock_calculations(initial_analytics, initial_analytics['total_suggestions']):
             return False
@@ -242,39 +381,16 @@ class AnalyticsEndpointTester:
         initial_total = initial_analytics['total_suggestions']
         initial_successful = initial_analytics['successful_suggestions']
         
-        # Create suggestions with confidence > 0.5 (should count as successful)
-        high_confidence_suggestions = []
-        for _ in range(2):
-            suggestion = self.create_test_suggestion(confidence_score=0.7)
-            if suggestion:
-                high_confidence_suggestions.append(suggestion)
-                print(f"Created suggestion with confidence: {suggestion['confidence_score']}")
-        
-        # Create suggestions with confidence <= 0.5 (should not count as successful)
-        low_confidence_suggestions = []
-        for _ in range(1):
-            suggestion = self.create_test_suggestion(confidence_score=0.3)
-            if suggestion:
-                low_confidence_suggestions.append(suggestion)
-                print(f"Created suggestion with confidence: {suggestion['confidence_score']}")
-        
-        # Wait for database to update
-        print("\nWaiting for database to update...")
-        time.sleep(2)
-        
-        # Get updated analytics
-        updated_analytics = self.get_analytics()
-        if not updated_analytics:
-            print("❌ Failed to get updated analytics")
-            return False
+        # Write out the checks so far before the slow suggestion requests
+        flush_output()
         
-        print("\n📊 Updated Analytics Data:")
-        print(f"Total Suggestions: {updated_analytics['total_suggestions']}")
-        print(f"Successful Suggestions: {updated_analytics['successful_suggestions']}")
-        print(f"Avg Confidence: {updated_analytics['avg_confidence']}%")
-        print(f"Avg Processing Time: {updated_analytics['avg_processing_time']}s")
-        print(f"Total Merge Requests: {updated_analytics['total_merge_requests']}")
-        print(f"Successful Merge Requests: {updated_analytics['successful_merge_requests']}")
+        # Create suggestions concurrently: two with confidence > 0.5 (should count as
+        # successful) and one with confidence <= 0.5 (should not count as successful)
+        high_confidence_suggestions, low_confidence_suggestions = self.create_test_suggestions(
+            [0.7, 0.7], [0.3]
+        )
+        for suggestion in high_confidence_suggestions + low_confidence_suggestions:
+            log(f"Created suggestion with confidence: {suggestion['confidence_score']}")
         
         # Calculate expected values
         expected_total = initial_total + len(high_confidence_suggestions) + len(low_confidence_suggestions)
@@ -283,6 +399,20 @@ class AnalyticsEndpointTester:
         high_confidence_count = sum(1 for s in high_confidence_suggestions if s['confidence_score'] > 0.5)
         expected_successful = initial_successful + high_confidence_count
         
+        # The suggestions were stored synchronously, so fresh analytics already include them
+        updated_analytics = self.get_analytics(use_cache=False)
+        if not updated_analytics:
+            log("❌ Failed to get updated analytics")
+            return False
+        
+        log("\n📊 Updated Analytics Data:")
+        log(f"Total Suggestions: {updated_analytics['total_suggestions']}")
+        log(f"Successful Suggestions: {updated_analytics['successful_suggestions']}")
+        log(f"Avg Confidence: {updated_analytics['avg_confidence']}%")
+        log(f"Avg Processing Time: {updated_analytics['avg_processing_time']}s")
+        log(f"Total Merge Requests: {updated_analytics['total_merge_requests']}")
+        log(f"Successful Merge Requests: {updated_analytics['successful_merge_requests']}")
+        
         # Verify updated analytics values
         if not self.verify_analytics_values(updated_analytics, expected_total, expected_successful):
             return False
@@ -291,33 +421,76 @@ class AnalyticsEndpointTester:
         if not self.verify_no_mock_calculations(updated_analytics, updated_analytics['total_suggestions']):
             return False
         
-        print("\n" + "="*50)
-        print("✅ ANALYTICS ENDPOINT TESTS PASSED")
-        print("="*50)
+        log("\n" + "="*50)
+        log("✅ ANALYTICS ENDPOINT TESTS PASSED")
+        log("="*50)
         
         return True
 
     def print_summary(self):
         """Print test summary"""
-        print("\n" + "="*50)
-        print(f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
-        print("="*50)
+        log("\n" + "="*50)
+        log(f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
+        log("="*50)
         
         for i, result in enumerate(self.test_results):
             status_icon = "✅" if result["status"] == "PASS" else "❌"
-            print(f"{i+1}. {status_icon} {result['name']} - {result['status']}")
+            log(f"{i+1}. {status_icon} {result['name']} - {result['status']}")
         
-        print("="*50)
+        log("="*50)
         
         if self.tests_passed == self.tests_run:
-            print("🎉 All tests passed!")
+            log("🎉 All tests passed!")
         else:
-            print(f"❌ {self.tests_run - self.tests_passed} tests failed")
+            log(f"❌ {self.tests_run - self.tests_passed} tests failed")
+        flush_output()
+
+# pytest entry points: `RUN_LIVE_API_TESTS=1 pytest analytics_test.py` runs the same checks
+# against a live backend (ANALYTICS_BASE_URL overrides the default preview host).
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("RUN_LIVE_API_TESTS"),
+    reason="live API tests need RUN_LIVE_API_TESTS=1 and a reachable backend"
+)
+
+@pytest.fixture(scope="module")
+def tester():
+    configure_logging()
+    base_url = os.environ.get("ANALYTICS_BASE_URL")
+    instance = AnalyticsEndpointTester(base_url) if base_url else AnalyticsEndpointTester()
+    yield instance
+    instance.close()
+
+@pytest.fixture(autouse=True)
+def flush_test_output():
+    # Each test's checks are written together once it finishes, pass or fail
+    yield
+    flush_output()
+
+def test_analytics_structure(tester):
+    analytics = tester.get_analytics()
+    assert analytics is not None
+    assert tester.verify_analytics_data_types(analytics)
+    assert tester.verify_analytics_formats(analytics)
+
+def test_analytics_no_mock_calculations(tester):
+    analytics = tester.get_analytics()
+    assert analytics is not None
+    assert tester.verify_no_mock_calculations(analytics, analytics['total_suggestions'])
+
+def test_analytics_unit_conversion(tester):
+    analytics = tester.get_analytics()
+    assert analytics is not None
+    assert tester.verify_analytics_ranges(analytics)
+
+def test_analytics_after_suggestions(tester):
+    assert tester.run_analytics_tests()
 
 def main():
+    configure_logging()
     tester = AnalyticsEndpointTester()
     tester.run_analytics_tests()
     tester.print_summary()
+    tester.close()
 
 if __name__ == "__main__":
     main()
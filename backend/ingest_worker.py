@@ -0,0 +1,129 @@
+"""Read-and-chunk step of repository ingestion, run in worker processes.
+
+Workers import this module rather than server.py, so starting one doesn't pull in the embedding
+model, the database clients or the FastAPI app. Keep its imports light.
+"""
+import ast
+import logging
+import pickle
+from pathlib import Path
+from typing import List, Dict, Optional, Any
+import yaml
+
+# Per-worker chunking settings, set once by init_worker
+tokenizer = None
+chunk_tokens = 0
+overlap_tokens = 0
+
+class CodeFeatureVisitor(ast.NodeVisitor):
+    """Collects function/class names, imports and a simple complexity score in one traversal"""
+    
+    def __init__(self):
+        self.function_name = None
+        self.class_name = None
+        self.imports = []
+        # Each control flow statement adds a branch to the score
+        self.complexity = 1
+    
+    def visit_FunctionDef(self, node):
+        self.function_name = node.name
+        self.generic_visit(node)
+    
+    def visit_ClassDef(self, node):
+        self.class_name = node.name
+        self.generic_visit(node)
+    
+    def visit_Import(self, node):
+        self.imports.extend([alias.name for alias in node.names])
+    
+    def visit_ImportFrom(self, node):
+        self.imports.append(node.module or "")
+    
+    def visit_branch(self, node):
+        self.complexity += 1
+        self.generic_visit(node)
+    
+    visit_If = visit_For = visit_While = visit_Try = visit_ExceptHandler = visit_AsyncFor = visit_AsyncWith = visit_branch
+
+def extract_code_features(content: str, file_path: str) -> Dict[str, Any]:
+    """Extract features from code content"""
+    features = {
+        "language": "python" if file_path.endswith(".py") else "yaml" if file_path.endswith((".yml", ".yaml")) else "unknown",
+        "function_name": None,
+        "class_name": None,
+        "imports": [],
+        "complexity_score": 1.0
+    }
+    
+    try:
+        if file_path.endswith(".py"):
+            # Parse Python code
+            visitor = CodeFeatureVisitor()
+            visitor.visit(ast.parse(content))
+            features["function_name"] = visitor.function_name
+            features["class_name"] = visitor.class_name
+            features["imports"] = visitor.imports
+            features["complexity_score"] = visitor.complexity
+            
+        elif file_path.endswith((".yml", ".yaml")):
+            # Parse YAML/Ansible content
+            try:
+                yaml_content = yaml.safe_load(content)
+                if isinstance(yaml_content, dict):
+                    features["function_name"] = yaml_content.get("name", "")
+                    if "tasks" in yaml_content:
+                        features["complexity_score"] = len(yaml_content["tasks"])
+            except:
+                pass
+                
+    except Exception as e:
+        logging.warning(f"Failed to extract features from {file_path}: {str(e)}")
+    
+    return features
+
+def chunk_by_tokens(content: str, tokenizer, chunk_tokens: int, overlap_tokens: int) -> List[str]:
+    """Split content into windows of chunk_tokens model tokens overlapping by overlap_tokens.
+    
+    Windows are cut from the original text using token offsets, so chunks keep their exact formatting.
+    """
+    offsets = tokenizer(content, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+    step = max(1, chunk_tokens - overlap_tokens)
+    chunks = []
+    for i in range(0, len(offsets), step):
+        window = offsets[i:i + chunk_tokens]
+        chunk_content = content[window[0][0]:window[-1][1]]
+        if chunk_content.strip():
+            chunks.append(chunk_content)
+        # The last window already reached the end of the content
+        if i + chunk_tokens >= len(offsets):
+            break
+    return chunks
+
+def init_worker(tokenizer_state: bytes, worker_chunk_tokens: int, worker_overlap_tokens: int):
+    """Pool initializer: load the embedding model's tokenizer once for every file this worker chunks.
+    
+    The tokenizer arrives pickled so the parent never serializes the live one outside the embedding thread.
+    """
+    global tokenizer, chunk_tokens, overlap_tokens
+    tokenizer = pickle.loads(tokenizer_state)
+    chunk_tokens = worker_chunk_tokens
+    overlap_tokens = worker_overlap_tokens
+
+def read_and_chunk_file(file_path: Path, relative_path: str) -> Optional[Dict[str, Any]]:
+    """Read a file, extract its code features and split it into token windows.
+    
+    Returns None for files that are skipped.
+    """
+    # Skip very large files before reading them
+    if file_path.stat().st_size > 100000:  # 100KB limit
+        return None
+    
+    with open(file_path, 'rb') as f:
+        content = f.read().decode('utf-8', errors='replace')
+    
+    return {
+        "relative_path": relative_path,
+        "file_ext": file_path.suffix,
+        "features": extract_code_features(content, relative_path),
+        "chunks": chunk_by_tokens(content, tokenizer, chunk_tokens, overlap_tokens)
+    }
@@ -1,27 +1,52 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Request, Response
 from dotenv import load_dotenv
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from prometheus_client import Histogram, make_asgi_app
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import Binary
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional, Any
 import uuid
+import time
+import hashlib
+import base64
+import functools
+import contextlib
+import pickle
+import fcntl
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import httpx
 import asyncio
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import json
+import asyncpg
+import orjson
 import git
 import tempfile
 import shutil
 from sentence_transformers import SentenceTransformer
+try:
+    import torch
+except ImportError:  # sentence-transformers normally pulls torch in; run on CPU without it
+    torch = None
 import numpy as np
+try:
+    from numba import njit, prange
+except ImportError:  # optional; the binary search prefilter falls back to NumPy
+    njit = None
+try:
+    import hnswlib
+except ImportError:  # optional; large indexes use the binary search prefilter instead
+    hnswlib = None
 import re
-import ast
-import yaml
+from ingest_worker import init_worker, read_and_chunk_file
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -32,15 +57,63 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI(title="Advanced RAG Code Suggestion API", version="2.0.0")
+app = FastAPI(title="Advanced RAG Code Suggestion API", version="2.0.0", default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Global variables for models
 sentence_model = None
+sentence_model_name = None
 vectorizer_status = {"status": "not_started", "details": []}
 
+# Normalized embedding matrix for semantic search, rebuilt when code_chunks changes
+code_chunks_version = 0
+# "layout" changes whenever rows are reordered, i.e. on a full reload; graph labels are row positions
+search_index = {"version": None, "layout": 0, "matrix": None, "buffer": None, "codes": None, "hnsw": None, "hnsw_rows": 0, "chunks": []}
+hnsw_build_task: Optional[asyncio.Task] = None
+search_index_lock = asyncio.Lock()
+
+# Append-only float16 sidecar of chunk vectors, one file per embedding width; chunk documents
+# record their row so the search index can be rebuilt without pulling embeddings out of MongoDB.
+# Each file starts with a random generation id that chunks also record, so rows are only trusted
+# while the file they were written to is still the one on disk
+VECTOR_STORE_DIR = Path(os.environ.get('VECTOR_STORE_DIR', Path.home() / '.local' / 'share' / 'rag-assistant'))
+VECTOR_STORE_HEADER_SIZE = 16  # uuid4 bytes
+vector_store_lock = asyncio.Lock()
+
+# Shared HTTP client for OLLAMA/GitLab/JIRA calls, created on startup so connections are pooled
+http_client: Optional[httpx.AsyncClient] = None
+
+# Process-wide asyncpg pool, opened at startup and rebuilt whenever the configured Postgres connection changes
+pg_pool = None
+pg_pool_key = None
+pg_pool_lock = asyncio.Lock()
+
+# Search only goes to pgvector after a probe found the table and a record that it mirrors the
+# repository's current chunk run; the result is cached, and failed probes back off exponentially
+PGVECTOR_PROBE_TTL = 60.0
+PGVECTOR_RETRY_MIN = 5.0
+PGVECTOR_RETRY_MAX = 300.0
+pgvector_probe = {"key": None, "ready": False, "checked_at": None, "failures": 0}
+pgvector_probe_lock = asyncio.Lock()
+
+# Upper bound for each service check in /api/status/all
+STATUS_CHECK_TIMEOUT = 10.0
+
+# Short-lived cache for /api/analytics, cleared whenever a new suggestion is stored
+ANALYTICS_CACHE_TTL = float(os.environ.get('ANALYTICS_CACHE_TTL', '10'))
+analytics_cache = {"value": None, "expires": 0.0}
+analytics_cache_lock = asyncio.Lock()
+
+# The service config is read by nearly every endpoint; keep it in memory and reload after updates
+CONFIG_CACHE_TTL = 30.0
+config_cache = {"value": None, "expires": 0.0}
+config_cache_lock = asyncio.Lock()
+
+# Background task that periodically rebuilds the analytics counters
+analytics_reconcile_task = None
+
 # Enhanced Configuration Models
 class ServiceConfig(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -59,9 +132,24 @@ class ServiceConfig(BaseModel):
     target_repository: str = os.environ.get('TARGET_REPOSITORY', '')
     default_branch: str = os.environ.get('DEFAULT_BRANCH', 'main')
     embedding_model: str = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
-    chunk_size: int = int(os.environ.get('CHUNK_SIZE', '512'))
-    chunk_overlap: int = int(os.environ.get('CHUNK_OVERLAP', '50'))
+    embedding_device: str = os.environ.get('EMBEDDING_DEVICE', '')  # empty means auto-detect
+    chunk_size: int = int(os.environ.get('CHUNK_SIZE', '512'))  # tokens, capped at the model's max sequence length
+    chunk_overlap: int = int(os.environ.get('CHUNK_OVERLAP', '50'))  # tokens
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    @property
+    def gitlab_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.gitlab_token}"}
+    
+    @property
+    def jira_headers(self) -> Dict[str, str]:
+        return {"Authorization": basic_auth_header(self.jira_username, self.jira_token)}
+
+@functools.lru_cache(maxsize=8)
+def basic_auth_header(username: str, token: str) -> str:
+    """Encode Basic auth credentials once per credential pair"""
+    credentials = base64.b64encode(f"{username}:{token}".encode()).decode()
+    return f"Basic {credentials}"
 
 class ConfigUpdate(BaseModel):
     ollama_url: Optional[str] = None
@@ -79,6 +167,7 @@ class ConfigUpdate(BaseModel):
     target_repository: Optional[str] = None
     default_branch: Optional[str] = None
     embedding_model: Optional[str] = None
+    embedding_device: Optional[str] = None
     chunk_size: Optional[int] = None
     chunk_overlap: Optional[int] = None
 
@@ -132,7 +221,11 @@ class CodeChunk(BaseModel):
     class_name: Optional[str] = None
     imports: List[str] = []
     complexity_score: float
-    embedding: Optional[List[float]] = None
+    embedding: Optional[Any] = None  # float16 bytes, see encode_embedding
+    vector_row: Optional[int] = None  # row in the vector store sidecar
+    vector_store_id: Optional[str] = None  # generation of the sidecar the row belongs to
+    repository: Optional[str] = None
+    run_id: Optional[str] = None  # vectorization run that stored the chunk; older runs are removed
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AnalyticsData(BaseModel):
@@ -147,85 +240,186 @@ class AnalyticsData(BaseModel):
     top_ticket_types: List[Dict[str, Any]] = []
 
 # Enhanced Helper Functions
-async def get_config() -> ServiceConfig:
-    """Get the current configuration"""
-    config_doc = await db.service_config.find_one({}, sort=[("created_at", -1)])
+CONFIG_DOC_ID = "singleton"
+
+async def migrate_service_config():
+    """Collapse legacy append-only config history into the single config document"""
+    if await db.service_config.find_one({"_id": CONFIG_DOC_ID}):
+        return
+    latest = await db.service_config.find_one({}, sort=[("created_at", -1)])
+    if latest:
+        del latest["_id"]
+        await db.service_config.update_one({"_id": CONFIG_DOC_ID}, {"$set": latest}, upsert=True)
+        result = await db.service_config.delete_many({"_id": {"$ne": CONFIG_DOC_ID}})
+        logging.info(f"Migrated service config to single document, removed {result.deleted_count} old versions")
+
+async def load_config() -> ServiceConfig:
+    """Load the current configuration from the database"""
+    config_doc = await db.service_config.find_one({"_id": CONFIG_DOC_ID})
     if config_doc:
-        return ServiceConfig(**config_doc)
-    # Return default config
+        # Stored configs were validated on write, so skip re-validating them on every reload
+        return ServiceConfig.model_construct(**config_doc)
+    # Store and return default config
     default_config = ServiceConfig()
-    await db.service_config.insert_one(default_config.dict())
+    await db.service_config.update_one(
+        {"_id": CONFIG_DOC_ID}, {"$setOnInsert": default_config.dict()}, upsert=True
+    )
     return default_config
 
+VECTORIZATION_STATUS_TTL = 7 * 24 * 60 * 60
+
+async def ensure_indexes():
+    """Create the indexes used by analytics and suggestion lookups"""
+    await db.advanced_code_suggestions.create_indexes([
+        # Also serves created_at-only filters and sorts (in either direction) as its prefix
+        IndexModel([("created_at", 1), ("confidence_score", 1)]),
+        IndexModel([("confidence_score", 1)]),
+        IndexModel([("created_date", 1)]),
+        IndexModel([("ticket_id", 1), ("created_at", -1)])
+    ])
+    await db.code_chunks.create_index([("file_path", 1), ("chunk_index", 1)])
+    await db.code_chunks.create_index("id")
+    await db.code_chunks.create_index([("repository", 1), ("run_id", 1)])
+    await db.code_chunks.create_index("vector_store_id")
+    await db.vectorization_status.create_indexes([
+        IndexModel([("repository", 1)]),
+        # Status of repositories that haven't been vectorized for a week expires on its own;
+        # the same index serves the latest-status lookup in /vectorize/status
+        IndexModel([("last_updated", 1)], expireAfterSeconds=VECTORIZATION_STATUS_TTL)
+    ])
+
+def invalidate_config_cache():
+    """Drop the cached configuration so the next get_config() reloads it"""
+    config_cache["value"] = None
+    config_cache["expires"] = 0.0
+
+def store_config_cache(config: ServiceConfig):
+    """Write a just-saved configuration through to the cache"""
+    config_cache["value"] = config.copy()
+    config_cache["expires"] = time.monotonic() + CONFIG_CACHE_TTL
+
+async def get_config() -> ServiceConfig:
+    """Get the current configuration"""
+    # Fresh cache hits don't need the lock; it only serialises the reload
+    if config_cache["value"] is None or time.monotonic() >= config_cache["expires"]:
+        async with config_cache_lock:
+            if config_cache["value"] is None or time.monotonic() >= config_cache["expires"]:
+                config_cache["value"] = await load_config()
+                config_cache["expires"] = time.monotonic() + CONFIG_CACHE_TTL
+    # Hand out a copy so callers can't mutate the cached config
+    return config_cache["value"].copy()
+
+def detect_embedding_device() -> str:
+    """Pick the fastest available device for the embedding model"""
+    if torch is None:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
 async def init_sentence_model():
     """Initialize the sentence transformer model"""
-    global sentence_model
+    global sentence_model, sentence_model_name
     if sentence_model is None:
         config = await get_config()
+        device = config.embedding_device or detect_embedding_device()
         try:
-            sentence_model = SentenceTransformer(config.embedding_model)
-            logging.info(f"Loaded embedding model: {config.embedding_model}")
+            sentence_model = SentenceTransformer(config.embedding_model, device=device)
+            sentence_model_name = config.embedding_model
+            logging.info(f"Loaded embedding model: {config.embedding_model} on {device}")
         except Exception as e:
             logging.error(f"Failed to load embedding model: {str(e)}")
-            sentence_model = SentenceTransformer('all-MiniLM-L6-v2')  # fallback
+            sentence_model = SentenceTransformer('all-MiniLM-L6-v2', device=device)  # fallback
+            sentence_model_name = 'all-MiniLM-L6-v2'
+        
+        sentence_model.eval()
+        if torch is not None and os.environ.get('EMBEDDING_THREADS'):
+            # Cap intra-op threads when other CPU-heavy work shares the host
+            torch.set_num_threads(int(os.environ['EMBEDDING_THREADS']))
+        if torch is not None and device.startswith("cuda"):
+            # Half precision on GPU; cosine similarity doesn't need fp32 accuracy
+            sentence_model.half()
+            torch.set_float32_matmul_precision("high")
+
+# Every encode runs on this single thread: CPU-heavy forward passes stay off the event loop, and the
+# model and its tokenizer are never used from two threads at once (ingestion tokenizes in worker
+# processes, from a copy of the tokenizer pickled on this thread)
+embedding_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+
+def inference_context():
+    """Disable autograd tracking around model calls"""
+    return torch.inference_mode() if torch is not None else contextlib.nullcontext()
+
+class Stopwatch:
+    """Monotonic timer for measuring service response times"""
+    __slots__ = ("start_ns",)
+    
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+    
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter_ns() - self.start_ns) / 1e6
 
 async def check_ollama_connection(config: ServiceConfig) -> ConnectionStatus:
     """Enhanced OLLAMA service connection check"""
-    start_time = datetime.now()
+    timer = Stopwatch()
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # Check if server is running
-            response = await client.get(f"{config.ollama_url}/api/tags")
-            response_time = (datetime.now() - start_time).total_seconds() * 1000
+        # Check if server is running
+        response = await http_client.get(f"{config.ollama_url}/api/tags")
+        response_time = timer.elapsed_ms
+        
+        if response.status_code == 200:
+            models = response.json().get("models", [])
+            model_names = [m.get("name", "") for m in models]
             
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_names = [m.get("name", "") for m in models]
-                
-                # Check if configured model is available
-                model_available = any(config.ollama_model in name for name in model_names)
+            # Check if configured model is available
+            model_available = any(config.ollama_model in name for name in model_names)
+            
+            # Test model if available
+            if model_available:
+                test_response = await http_client.post(
+                    f"{config.ollama_url}/api/generate",
+                    json={
+                        "model": config.ollama_model,
+                        "prompt": "def hello():",
+                        "stream": False,
+                        "options": {"num_predict": 10}
+                    }
+                )
                 
-                # Test model if available
-                if model_available:
-                    test_response = await client.post(
-                        f"{config.ollama_url}/api/generate",
-                        json={
-                            "model": config.ollama_model,
-                            "prompt": "def hello():",
-                            "stream": False,
-                            "options": {"num_predict": 10}
+                if test_response.status_code == 200:
+                    return ConnectionStatus(
+                        service="ollama",
+                        status="connected",
+                        message=f"Model {config.ollama_model} is ready. Available models: {len(models)}",
+                        response_time_ms=response_time,
+                        details={
+                            "available_models": model_names,
+                            "configured_model": config.ollama_model,
+                            "model_ready": True
                         }
                     )
-                    
-                    if test_response.status_code == 200:
-                        return ConnectionStatus(
-                            service="ollama",
-                            status="connected",
-                            message=f"Model {config.ollama_model} is ready. Available models: {len(models)}",
-                            response_time_ms=response_time,
-                            details={
-                                "available_models": model_names,
-                                "configured_model": config.ollama_model,
-                                "model_ready": True
-                            }
-                        )
-                
-                return ConnectionStatus(
-                    service="ollama",
-                    status="error",
-                    message=f"Model {config.ollama_model} not found. Available: {model_names}",
-                    response_time_ms=response_time,
-                    details={"available_models": model_names}
-                )
-            else:
-                return ConnectionStatus(
-                    service="ollama",
-                    status="error",
-                    message=f"HTTP {response.status_code}: {response.text}",
-                    response_time_ms=response_time
-                )
+            
+            return ConnectionStatus(
+                service="ollama",
+                status="error",
+                message=f"Model {config.ollama_model} not found. Available: {model_names}",
+                response_time_ms=response_time,
+                details={"available_models": model_names}
+            )
+        else:
+            return ConnectionStatus(
+                service="ollama",
+                status="error",
+                message=f"HTTP {response.status_code}: {response.text}",
+                response_time_ms=response_time
+            )
     except Exception as e:
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
+        response_time = timer.elapsed_ms
         return ConnectionStatus(
             service="ollama",
             status="error",
@@ -235,7 +429,7 @@ async def check_ollama_connection(config: ServiceConfig) -> ConnectionStatus:
 
 async def check_gitlab_connection(config: ServiceConfig) -> ConnectionStatus:
     """Enhanced GitLab service connection check"""
-    start_time = datetime.now()
+    timer = Stopwatch()
     try:
         if not config.gitlab_token:
             return ConnectionStatus(
@@ -244,45 +438,44 @@ async def check_gitlab_connection(config: ServiceConfig) -> ConnectionStatus:
                 message="GitLab token not configured"
             )
             
-        headers = {"Authorization": f"Bearer {config.gitlab_token}"}
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # Check user access
-            response = await client.get(f"{config.gitlab_url}/api/v4/user", headers=headers)
-            response_time = (datetime.now() - start_time).total_seconds() * 1000
+        headers = config.gitlab_headers
+        # Check user access
+        response = await http_client.get(f"{config.gitlab_url}/api/v4/user", headers=headers)
+        response_time = timer.elapsed_ms
+        
+        if response.status_code == 200:
+            user_data = response.json()
             
-            if response.status_code == 200:
-                user_data = response.json()
-                
-                # Check repository access if configured
-                repo_access = False
-                if config.target_repository:
-                    repo_response = await client.get(
-                        f"{config.gitlab_url}/api/v4/projects/{config.target_repository.replace('/', '%2F')}", 
-                        headers=headers
-                    )
-                    repo_access = repo_response.status_code == 200
-                
-                return ConnectionStatus(
-                    service="gitlab",
-                    status="connected",
-                    message=f"Connected as {user_data.get('name', 'Unknown')}",
-                    response_time_ms=response_time,
-                    details={
-                        "user": user_data.get("username", ""),
-                        "user_id": user_data.get("id"),
-                        "repository_access": repo_access,
-                        "target_repository": config.target_repository
-                    }
-                )
-            else:
-                return ConnectionStatus(
-                    service="gitlab",
-                    status="error",
-                    message=f"HTTP {response.status_code}: {response.text}",
-                    response_time_ms=response_time
+            # Check repository access if configured
+            repo_access = False
+            if config.target_repository:
+                repo_response = await http_client.get(
+                    f"{config.gitlab_url}/api/v4/projects/{config.target_repository.replace('/', '%2F')}", 
+                    headers=headers
                 )
+                repo_access = repo_response.status_code == 200
+            
+            return ConnectionStatus(
+                service="gitlab",
+                status="connected",
+                message=f"Connected as {user_data.get('name', 'Unknown')}",
+                response_time_ms=response_time,
+                details={
+                    "user": user_data.get("username", ""),
+                    "user_id": user_data.get("id"),
+                    "repository_access": repo_access,
+                    "target_repository": config.target_repository
+                }
+            )
+        else:
+            return ConnectionStatus(
+                service="gitlab",
+                status="error",
+                message=f"HTTP {response.status_code}: {response.text}",
+                response_time_ms=response_time
+            )
     except Exception as e:
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
+        response_time = timer.elapsed_ms
         return ConnectionStatus(
             service="gitlab",
             status="error",
@@ -292,7 +485,7 @@ async def check_gitlab_connection(config: ServiceConfig) -> ConnectionStatus:
 
 async def check_jira_connection(config: ServiceConfig) -> ConnectionStatus:
     """Enhanced JIRA service connection check"""
-    start_time = datetime.now()
+    timer = Stopwatch()
     try:
         if not config.jira_username or not config.jira_token:
             return ConnectionStatus(
@@ -301,43 +494,40 @@ async def check_jira_connection(config: ServiceConfig) -> ConnectionStatus:
                 message="JIRA credentials not configured"
             )
             
-        import base64
-        credentials = base64.b64encode(f"{config.jira_username}:{config.jira_token}".encode()).decode()
-        headers = {"Authorization": f"Basic {credentials}"}
+        headers = config.jira_headers
         
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # Check user authentication
-            response = await client.get(f"{config.jira_url}/rest/api/2/myself", headers=headers)
-            response_time = (datetime.now() - start_time).total_seconds() * 1000
+        # Check user authentication
+        response = await http_client.get(f"{config.jira_url}/rest/api/2/myself", headers=headers)
+        response_time = timer.elapsed_ms
+        
+        if response.status_code == 200:
+            user_data = response.json()
             
-            if response.status_code == 200:
-                user_data = response.json()
-                
-                # Check available projects
-                projects_response = await client.get(f"{config.jira_url}/rest/api/2/project", headers=headers)
-                projects = projects_response.json() if projects_response.status_code == 200 else []
-                
-                return ConnectionStatus(
-                    service="jira",
-                    status="connected",
-                    message=f"Connected as {user_data.get('displayName', 'Unknown')}",
-                    response_time_ms=response_time,
-                    details={
-                        "user": user_data.get("name", ""),
-                        "display_name": user_data.get("displayName", ""),
-                        "projects_count": len(projects),
-                        "projects": [p.get("key") for p in projects[:5]]  # First 5 projects
-                    }
-                )
-            else:
-                return ConnectionStatus(
-                    service="jira",
-                    status="error",
-                    message=f"HTTP {response.status_code}: {response.text}",
-                    response_time_ms=response_time
-                )
+            # Check available projects
+            projects_response = await http_client.get(f"{config.jira_url}/rest/api/2/project", headers=headers)
+            projects = projects_response.json() if projects_response.status_code == 200 else []
+            
+            return ConnectionStatus(
+                service="jira",
+                status="connected",
+                message=f"Connected as {user_data.get('displayName', 'Unknown')}",
+                response_time_ms=response_time,
+                details={
+                    "user": user_data.get("name", ""),
+                    "display_name": user_data.get("displayName", ""),
+                    "projects_count": len(projects),
+                    "projects": [p.get("key") for p in projects[:5]]  # First 5 projects
+                }
+            )
+        else:
+            return ConnectionStatus(
+                service="jira",
+                status="error",
+                message=f"HTTP {response.status_code}: {response.text}",
+                response_time_ms=response_time
+            )
     except Exception as e:
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
+        response_time = timer.elapsed_ms
         return ConnectionStatus(
             service="jira",
             status="error",
@@ -345,9 +535,52 @@ async def check_jira_connection(config: ServiceConfig) -> ConnectionStatus:
             response_time_ms=response_time
         )
 
+VECTOR_TABLES_QUERY = """
+    SELECT table_name FROM information_schema.tables 
+    WHERE table_schema = 'public' AND table_name LIKE '%vector%' OR table_name LIKE '%embedding%';
+"""
+
+async def get_pg_pool(config: ServiceConfig):
+    """Return the shared asyncpg pool, recreating it if the Postgres settings changed"""
+    global pg_pool, pg_pool_key
+    key = (config.postgres_host, config.postgres_port, config.postgres_db, config.postgres_user, config.postgres_password)
+    async with pg_pool_lock:
+        if pg_pool is not None and pg_pool_key == key:
+            return pg_pool
+        if pg_pool is not None:
+            await pg_pool.close()
+            pg_pool = None
+        pg_pool = await asyncpg.create_pool(
+            host=config.postgres_host,
+            port=config.postgres_port,
+            database=config.postgres_db,
+            user=config.postgres_user,
+            password=config.postgres_password,
+            min_size=5,
+            max_size=20,
+            timeout=2.0,
+            command_timeout=30
+        )
+        pg_pool_key = key
+        return pg_pool
+
+async def probe_postgres_asyncpg(config: ServiceConfig) -> Dict[str, Any]:
+    """Inspect Postgres/pgvector over the pooled asyncpg connection"""
+    pool = await get_pg_pool(config)
+    async with pool.acquire() as conn:
+        pg_version = await conn.fetchval("SELECT version();", timeout=2.0)
+        has_vector = await conn.fetchrow("SELECT extname FROM pg_extension WHERE extname = 'vector';", timeout=2.0) is not None
+        vector_tables = [row['table_name'] for row in await conn.fetch(VECTOR_TABLES_QUERY, timeout=2.0)]
+    
+    return {
+        "pg_version": pg_version.split()[0:3],
+        "has_vector": has_vector,
+        "vector_tables": vector_tables
+    }
+
 async def check_postgres_connection(config: ServiceConfig) -> ConnectionStatus:
     """Enhanced PostgreSQL with pgvector connection check"""
-    start_time = datetime.now()
+    timer = Stopwatch()
     try:
         if not config.postgres_password:
             return ConnectionStatus(
@@ -355,42 +588,10 @@ async def check_postgres_connection(config: ServiceConfig) -> ConnectionStatus:
                 status="not_configured",
                 message="PostgreSQL password not configured"
             )
-            
-        connection_string = f"host={config.postgres_host} port={config.postgres_port} dbname={config.postgres_db} user={config.postgres_user} password={config.postgres_password}"
         
-        def test_connection():
-            conn = psycopg2.connect(connection_string)
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Basic connection test
-            cursor.execute("SELECT version();")
-            pg_version = cursor.fetchone()['version']
-            
-            # Check for pgvector extension
-            cursor.execute("SELECT extname FROM pg_extension WHERE extname = 'vector';")
-            has_vector = cursor.fetchone() is not None
-            
-            # Check vector tables
-            cursor.execute("""
-                SELECT table_name FROM information_schema.tables 
-                WHERE table_schema = 'public' AND table_name LIKE '%vector%' OR table_name LIKE '%embedding%';
-            """)
-            vector_tables = [row['table_name'] for row in cursor.fetchall()]
-            
-            cursor.close()
-            conn.close()
-            
-            return {
-                "pg_version": pg_version.split()[0:3],
-                "has_vector": has_vector,
-                "vector_tables": vector_tables
-            }
-            
-        import asyncio
-        loop = asyncio.get_event_loop()
-        db_info = await loop.run_in_executor(None, test_connection)
+        db_info = await probe_postgres_asyncpg(config)
         
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
+        response_time = timer.elapsed_ms
         
         status = "connected" if db_info["has_vector"] else "error"
         message = "Connected with pgvector support" if db_info["has_vector"] else "Connected but pgvector extension not found"
@@ -404,7 +605,7 @@ async def check_postgres_connection(config: ServiceConfig) -> ConnectionStatus:
         )
         
     except Exception as e:
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
+        response_time = timer.elapsed_ms
         return ConnectionStatus(
             service="postgres",
             status="error",
@@ -412,57 +613,277 @@ async def check_postgres_connection(config: ServiceConfig) -> ConnectionStatus:
             response_time_ms=response_time
         )
 
-def extract_code_features(content: str, file_path: str) -> Dict[str, Any]:
-    """Extract features from code content"""
-    features = {
-        "language": "python" if file_path.endswith(".py") else "yaml" if file_path.endswith((".yml", ".yaml")) else "unknown",
-        "function_name": None,
-        "class_name": None,
-        "imports": [],
-        "complexity_score": 1.0
-    }
-    
+# Files picked up during ingestion; also used as the sparse-checkout patterns
+INGEST_FILE_PATTERNS = ["*.py", "*.yml", "*.yaml", "*.j2", "*.md"]
+INGEST_EXTENSIONS = {pattern[1:] for pattern in INGEST_FILE_PATTERNS}
+# Directories pruned from the file scan
+EXCLUDE_DIRS = {".git", "__pycache__", "node_modules", ".venv"}
+
+def find_ingest_files(root_dir: str) -> List[Path]:
+    """Single walk of the checkout, pruning excluded directories and matching on suffix"""
+    all_files = []
+    for root, dirs, files in os.walk(root_dir):
+        dirs[:] = [d for d in dirs if d not in EXCLUDE_DIRS]
+        for name in files:
+            if os.path.splitext(name)[1] in INGEST_EXTENSIONS:
+                all_files.append(Path(root) / name)
+    return all_files
+
+def clone_repository(repo_url: str, dest: str, branch: str) -> git.Repo:
+    """Shallow, blobless clone of one branch, checking out only the files ingestion reads"""
+    repo = git.Repo.clone_from(
+        repo_url, dest, branch=branch,
+        depth=1, single_branch=True,
+        multi_options=["--filter=blob:none", "--sparse"]
+    )
     try:
-        if file_path.endswith(".py"):
-            # Parse Python code
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    features["function_name"] = node.name
-                elif isinstance(node, ast.ClassDef):
-                    features["class_name"] = node.name
-                elif isinstance(node, ast.Import):
-                    features["imports"].extend([alias.name for alias in node.names])
-                elif isinstance(node, ast.ImportFrom):
-                    features["imports"].append(node.module or "")
-            
-            # Simple complexity calculation
-            features["complexity_score"] = len(re.findall(r'\bif\b|\bfor\b|\bwhile\b|\btry\b|\bexcept\b', content)) + 1
-            
-        elif file_path.endswith((".yml", ".yaml")):
-            # Parse YAML/Ansible content
+        repo.git.sparse_checkout("set", "--no-cone", *INGEST_FILE_PATTERNS)
+    except git.GitCommandError as e:
+        # Older git without non-cone sparse checkout: fall back to the full tree of the shallow clone
+        logging.warning(f"Sparse checkout not available, checking out full tree: {str(e)}")
+        repo.git.sparse_checkout("disable")
+    return repo
+
+CHUNK_INSERT_BATCH_SIZE = 500
+CHUNK_INSERTS_IN_FLIGHT = 4
+MAX_CHUNK_TOKENS = 256
+EMBEDDING_CACHE_LOOKUP_BATCH = 1000
+# spawn where forkserver is unavailable (Windows); the forkserver preloads only the worker module
+if "forkserver" in multiprocessing.get_all_start_methods():
+    ingest_mp_context = multiprocessing.get_context("forkserver")
+    ingest_mp_context.set_forkserver_preload(["ingest_worker"])
+else:
+    ingest_mp_context = multiprocessing.get_context("spawn")
+
+def encode_embedding(embedding) -> Binary:
+    """Pack an embedding as raw float16 bytes for storage"""
+    return Binary(np.asarray(embedding, dtype=np.float16).tobytes())
+
+def decode_embedding(value) -> np.ndarray:
+    """Unpack a stored embedding; older documents hold a plain list of floats"""
+    if isinstance(value, bytes):
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+def embedding_cache_key(model_name: str, content: str) -> str:
+    """Content hash that identifies an embedding for a given model"""
+    return hashlib.blake2b(f"{model_name}\0{content}".encode(), digest_size=16).hexdigest()
+
+EMBEDDING_ENCODE_SLICE = 1024
+
+def encode_passages(texts: List[str]) -> np.ndarray:
+    """Unit-length embeddings for a batch of chunk texts"""
+    # encode() sorts the inputs by length internally so each batch pads to similar lengths,
+    # and returns them in input order
+    with inference_context():
+        return sentence_model.encode(
+            texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )
+
+async def embed_with_cache(texts: List[str]) -> tuple:
+    """Embed texts, only running the model on content not already in the embedding cache.
+    
+    Returns the embeddings (in input order) and the number of texts served from the cache.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32), 0
+    
+    keys = [embedding_cache_key(sentence_model_name, text) for text in texts]
+    unique_keys = list(dict.fromkeys(keys))
+    cached = {}
+    for start in range(0, len(unique_keys), EMBEDDING_CACHE_LOOKUP_BATCH):
+        batch = unique_keys[start:start + EMBEDDING_CACHE_LOOKUP_BATCH]
+        async for doc in db.embedding_cache.find({"_id": {"$in": batch}}, {"embedding": 1}):
+            # Entries cached before embeddings were normalized at encode time need rescaling
+            embedding = decode_embedding(doc["embedding"])
+            cached[doc["_id"]] = embedding / (np.linalg.norm(embedding) or 1.0)
+    
+    missing = {key: text for key, text in zip(keys, texts) if key not in cached}
+    if missing:
+        # Encoded in slices on the embedding thread so queued search queries can run in between
+        missing_texts = list(missing.values())
+        loop = asyncio.get_running_loop()
+        new_embeddings = np.concatenate([
+            await loop.run_in_executor(
+                embedding_executor, encode_passages, missing_texts[start:start + EMBEDDING_ENCODE_SLICE]
+            )
+            for start in range(0, len(missing_texts), EMBEDDING_ENCODE_SLICE)
+        ])
+        new_docs = []
+        for key, embedding in zip(missing, new_embeddings):
+            cached[key] = embedding
+            new_docs.append({"_id": key, "model": sentence_model_name, "embedding": encode_embedding(embedding)})
+        try:
+            await db.embedding_cache.insert_many(new_docs, ordered=False)
+        except BulkWriteError:
+            pass  # another run cached some of the same content first
+    
+    cache_hits = len(texts) - sum(1 for key in keys if key in missing)
+    return np.stack([cached[key] for key in keys]).astype(np.float32, copy=False), cache_hits
+
+def vector_store_path(dimension: int) -> Path:
+    return VECTOR_STORE_DIR / f"chunk_vectors_{dimension}.f16"
+
+def write_chunk_vectors(vectors: np.ndarray) -> tuple:
+    path = vector_store_path(vectors.shape[1])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        # Not O_APPEND: that would ignore the seek past a torn row and write at the end
+        with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b') as f:
+            # The asyncio lock only covers this process; other workers append to the same file
+            fcntl.flock(f, fcntl.LOCK_EX)
             try:
-                yaml_content = yaml.safe_load(content)
-                if isinstance(yaml_content, dict):
-                    features["function_name"] = yaml_content.get("name", "")
-                    if "tasks" in yaml_content:
-                        features["complexity_score"] = len(yaml_content["tasks"])
-            except:
-                pass
-                
-    except Exception as e:
-        logging.warning(f"Failed to extract features from {file_path}: {str(e)}")
+                if not path.exists() or os.fstat(f.fileno()).st_ino != path.stat().st_ino:
+                    continue  # a compaction replaced the file while we waited for the lock
+                end = f.seek(0, os.SEEK_END)
+                if end < VECTOR_STORE_HEADER_SIZE:
+                    f.truncate(0)
+                    f.write(uuid.uuid4().bytes)
+                    end = VECTOR_STORE_HEADER_SIZE
+                f.seek(0)
+                store_id = uuid.UUID(bytes=f.read(VECTOR_STORE_HEADER_SIZE)).hex
+                row_size = vectors.shape[1] * vectors.itemsize
+                # Round up past any torn row left by an interrupted append
+                start_row = -(-(end - VECTOR_STORE_HEADER_SIZE) // row_size)
+                f.seek(VECTOR_STORE_HEADER_SIZE + start_row * row_size)
+                vectors.tofile(f)
+                f.flush()
+                return start_row, store_id
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def rewrite_chunk_vectors(dimension: int, store_id: str, rows: List[int]) -> Optional[str]:
+    """Replace the sidecar with a new generation holding only the given rows, in order"""
+    path = vector_store_path(dimension)
+    with open(path, 'r+b') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            if uuid.UUID(bytes=f.read(VECTOR_STORE_HEADER_SIZE)).hex != store_id:
+                return None  # already replaced by another process
+            _, store = open_vector_store(dimension)
+            new_id = uuid.uuid4()
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, 'wb') as out:
+                out.write(new_id.bytes)
+                for start in range(0, len(rows), EMBEDDING_CACHE_LOOKUP_BATCH):
+                    np.ascontiguousarray(store[rows[start:start + EMBEDDING_CACHE_LOOKUP_BATCH]]).tofile(out)
+            os.replace(tmp_path, path)
+            return new_id.hex
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+async def append_chunk_vectors(embeddings: np.ndarray) -> tuple:
+    """Append vectors to the sidecar file and return the row of the first one and the file's generation"""
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float16)
+    async with vector_store_lock:
+        return await asyncio.to_thread(write_chunk_vectors, vectors)
+
+def open_vector_store(dimension: int) -> Optional[tuple]:
+    """Map the sidecar read-only and return its generation and rows; repeated opens are served from the page cache"""
+    path = vector_store_path(dimension)
+    # Whole rows only: an interrupted append can leave a torn row, even an odd number of bytes
+    rows = (path.stat().st_size - VECTOR_STORE_HEADER_SIZE) // (dimension * 2) if path.exists() else 0
+    if rows < 1:
+        return None
+    with open(path, 'rb') as f:
+        store_id = uuid.UUID(bytes=f.read(VECTOR_STORE_HEADER_SIZE)).hex
+    return store_id, np.memmap(path, dtype=np.float16, mode='r', offset=VECTOR_STORE_HEADER_SIZE, shape=(rows, dimension))
+
+async def compact_vector_store(dimension: int):
+    """Rewrite the sidecar without the rows of removed chunks once they make up most of it.
+    
+    Chunks written in between (by another process) keep the old generation and are served from
+    their MongoDB embedding until the next run.
+    """
+    global code_chunks_version
+    opened = open_vector_store(dimension)
+    if opened is None:
+        return
+    store_id, store = opened
+    live = []
+    async for doc in db.code_chunks.find({"vector_store_id": store_id}, {"_id": 0, "id": 1, "vector_row": 1}):
+        if doc.get("vector_row") is not None and doc["vector_row"] < len(store):
+            live.append((doc["vector_row"], doc["id"]))
+    if len(live) * 2 > len(store):
+        return
+    live.sort()
+    async with vector_store_lock:
+        new_id = await asyncio.to_thread(rewrite_chunk_vectors, dimension, store_id, [row for row, _ in live])
+    if new_id is None:
+        return
+    updates = [
+        UpdateOne({"id": chunk_id}, {"$set": {"vector_row": new_row, "vector_store_id": new_id}})
+        for new_row, (_, chunk_id) in enumerate(live)
+    ]
+    for start in range(0, len(updates), CHUNK_INSERT_BATCH_SIZE):
+        await db.code_chunks.bulk_write(updates[start:start + CHUNK_INSERT_BATCH_SIZE], ordered=False)
+    code_chunks_version += 1
+    logging.info(f"Compacted vector store to {len(live)} of {len(store)} rows")
+
+async def remove_stale_chunks(config: ServiceConfig, repository: str, run_id: str) -> tuple:
+    """Delete the chunks earlier runs stored for this repository, from MongoDB and pgvector.
     
-    return features
+    Returns how many were removed and whether pgvector was cleaned up too.
+    """
+    global code_chunks_version
+    # Chunks from before runs were tagged carry no repository; the new run replaces them too
+    stale = {"repository": {"$in": [repository, None]}, "run_id": {"$ne": run_id}}
+    stale_ids = [doc["id"] async for doc in db.code_chunks.find(stale, {"_id": 0, "id": 1})]
+    pgvector_clean = True
+    for start in range(0, len(stale_ids), EMBEDDING_CACHE_LOOKUP_BATCH):
+        batch = stale_ids[start:start + EMBEDDING_CACHE_LOOKUP_BATCH]
+        await db.code_chunks.delete_many({"id": {"$in": batch}})
+        if pgvector_enabled(config) and pgvector_clean:
+            try:
+                pool = await get_pg_pool(config)
+                await pool.execute("DELETE FROM code_chunks WHERE id = ANY($1::text[])", batch)
+            except Exception as e:
+                logging.error(f"Failed to remove stale chunks from pgvector: {str(e)}")
+                pgvector_clean = False
+    if stale_ids:
+        code_chunks_version += 1
+    return len(stale_ids), pgvector_clean
+
+async def insert_code_chunks(chunk_docs: List[Dict[str, Any]]) -> int:
+    """Insert a batch of chunk documents and return how many were stored"""
+    global code_chunks_version
+    try:
+        # Documents come straight from the CodeChunk model, so server-side validation adds nothing
+        result = await db.code_chunks.insert_many(chunk_docs, ordered=False, bypass_document_validation=True)
+        code_chunks_version += 1
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        code_chunks_version += 1
+        logging.error(f"Failed to store {len(e.details.get('writeErrors', []))} of {len(chunk_docs)} code chunks")
+        return e.details.get("nInserted", 0)
+    except Exception as e:
+        logging.error(f"Failed to store {len(chunk_docs)} code chunks: {str(e)}")
+        return 0
+
+async def store_vectorization_status(repository: str, status: EnhancedVectorizationStatus):
+    """Keep one status document per repository instead of appending a new one per run"""
+    await db.vectorization_status.update_one(
+        {"repository": repository},
+        {"$set": status.dict() | {"repository": repository}},
+        upsert=True
+    )
 
 async def clone_and_process_repository(config: ServiceConfig) -> EnhancedVectorizationStatus:
     """Clone repository and process files for vectorization"""
     global vectorizer_status
     
+    start_time = datetime.now()
+    # Carries every EnhancedVectorizationStatus field so the status endpoint can report progress mid-run
     vectorizer_status = {
         "status": "in_progress",
+        "total_files": 0,
+        "processed_files": 0,
+        "failed_files": 0,
+        "total_chunks": 0,
+        "processed_chunks": 0,
+        "last_updated": start_time,
         "details": ["Starting repository cloning..."],
-        "start_time": datetime.now()
+        "start_time": start_time
     }
     
     try:
@@ -477,18 +898,13 @@ async def clone_and_process_repository(config: ServiceConfig) -> EnhancedVectori
             vectorizer_status["details"].append(f"Cloning repository: {repo_url}")
             
             # Clone repository
-            repo = git.Repo.clone_from(repo_url, temp_dir, branch=config.default_branch)
+            repo = clone_repository(repo_url, temp_dir, config.default_branch)
             
             # Find relevant files
-            file_patterns = ["*.py", "*.yml", "*.yaml", "*.j2", "*.md"]
-            all_files = []
-            
-            for pattern in file_patterns:
-                for file_path in Path(temp_dir).rglob(pattern):
-                    if file_path.is_file() and not any(exclude in str(file_path) for exclude in ['.git', '__pycache__', '.pyc']):
-                        all_files.append(file_path)
+            all_files = find_ingest_files(temp_dir)
             
             vectorizer_status["details"].append(f"Found {len(all_files)} files to process")
+            vectorizer_status.update(total_files=len(all_files), last_updated=datetime.now())
             
             processed_files = 0
             failed_files = 0
@@ -496,67 +912,135 @@ async def clone_and_process_repository(config: ServiceConfig) -> EnhancedVectori
             processed_chunks = 0
             file_types = {}
             
-            # Process each file
-            for file_path in all_files:
+            # Chunk by model tokens rather than characters so every chunk fits the embedding window
+            chunk_tokens = min(config.chunk_size, MAX_CHUNK_TOKENS, sentence_model.get_max_seq_length())
+            
+            # Pass 1: read, analyse and chunk files in parallel worker processes. Workers start from a
+            # forkserver rather than forking this process, which already runs the event loop,
+            # the HTTP client pools and the embedding threads; they only import ingest_worker and
+            # unpickle the tokenizer once, in the pool initializer
+            loop = asyncio.get_running_loop()
+            tokenizer_state = await loop.run_in_executor(embedding_executor, pickle.dumps, sentence_model.tokenizer)
+            max_workers = max(1, min(os.cpu_count() or 1, len(all_files)))
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=ingest_mp_context,
+                initializer=init_worker,
+                initargs=(tokenizer_state, chunk_tokens, config.chunk_overlap)
+            ) as pool:
+                results = await asyncio.gather(*[
+                    loop.run_in_executor(pool, read_and_chunk_file, file_path, str(file_path.relative_to(temp_dir)))
+                    for file_path in all_files
+                ], return_exceptions=True)
+            
+            pending_chunks = []
+            for file_path, result in zip(all_files, results):
+                if isinstance(result, Exception):
+                    failed_files += 1
+                    logging.error(f"Failed to process file {file_path}: {str(result)}")
+                    continue
+                
+                # Skipped (too large)
+                if result is None:
+                    continue
+                
+                chunks = result["chunks"]
+                file_types[result["file_ext"]] = file_types.get(result["file_ext"], 0) + 1
+                total_chunks += len(chunks)
+                for chunk_index, chunk_content in enumerate(chunks):
+                    pending_chunks.append((result["relative_path"], chunk_index, len(chunks), chunk_content, result["features"]))
+                
+                processed_files += 1
+            
+            vectorizer_status["details"].append(f"Processed {processed_files}/{len(all_files)} files")
+            vectorizer_status.update(
+                processed_files=processed_files,
+                failed_files=failed_files,
+                total_chunks=total_chunks,
+                file_types=file_types,
+                last_updated=datetime.now()
+            )
+            
+            # Pass 2: embed every chunk of the repository, reusing embeddings of unchanged content
+            vectorizer_status["details"].append(f"Generating embeddings for {len(pending_chunks)} chunks")
+            embeddings, cache_hits = await embed_with_cache([chunk[3] for chunk in pending_chunks])
+            vectorizer_status["details"].append(f"Reused {cache_hits} cached embeddings")
+            
+            start_row, store_id = await append_chunk_vectors(embeddings) if len(pending_chunks) else (0, None)
+            run_id = uuid.uuid4().hex
+            
+            # Version of the search index as it stands before this run's inserts
+            index_version = (code_chunks_version, await db.code_chunks.estimated_document_count())
+            
+            chunk_buffer = []
+            chunk_ids = []
+            chunk_docs = []
+            insert_tasks = []
+            for row, ((relative_path, chunk_index, file_chunks, chunk_content, features), embedding) in enumerate(zip(pending_chunks, embeddings), start_row):
+                chunk_doc = CodeChunk(
+                    file_path=relative_path,
+                    chunk_content=chunk_content,
+                    chunk_index=chunk_index,
+                    total_chunks=file_chunks,
+                    language=features["language"],
+                    function_name=features["function_name"],
+                    class_name=features["class_name"],
+                    imports=features["imports"],
+                    complexity_score=features["complexity_score"],
+                    embedding=encode_embedding(embedding),
+                    vector_row=row,
+                    vector_store_id=store_id,
+                    repository=config.target_repository,
+                    run_id=run_id
+                )
+                chunk_buffer.append(chunk_doc.dict())
+                chunk_ids.append(chunk_doc.id)
+                chunk_docs.append(chunk_buffer[-1])
+                
+                # Store in MongoDB in batches, keeping a few inserts in flight while the next batch is built
+                if len(chunk_buffer) >= CHUNK_INSERT_BATCH_SIZE:
+                    if len(insert_tasks) >= CHUNK_INSERTS_IN_FLIGHT:
+                        processed_chunks += await insert_tasks.pop(0)
+                        vectorizer_status.update(processed_chunks=processed_chunks, last_updated=datetime.now())
+                    insert_tasks.append(asyncio.create_task(insert_code_chunks(chunk_buffer)))
+                    chunk_buffer = []
+            
+            if chunk_buffer:
+                insert_tasks.append(asyncio.create_task(insert_code_chunks(chunk_buffer)))
+            processed_chunks += sum(await asyncio.gather(*insert_tasks))
+            
+            if chunk_docs and processed_chunks == len(chunk_docs):
+                await extend_search_index(
+                    index_version,
+                    [{key: value for key, value in doc.items() if key != "embedding"} for doc in chunk_docs],
+                    embeddings
+                )
+            
+            # Cached suggestions were built from search results over the old chunks
+            suggestion_cache.clear()
+            
+            # Mirror the vectors into pgvector so search can use its ANN index
+            pgvector_mirrored = False
+            if pgvector_enabled(config) and chunk_ids:
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    # Skip very large files
-                    if len(content) > 100000:  # 100KB limit
-                        continue
-                    
-                    relative_path = str(file_path.relative_to(temp_dir))
-                    file_ext = file_path.suffix
-                    file_types[file_ext] = file_types.get(file_ext, 0) + 1
-                    
-                    # Extract code features
-                    features = extract_code_features(content, relative_path)
-                    
-                    # Create chunks
-                    chunk_size = config.chunk_size
-                    chunks = []
-                    for i in range(0, len(content), chunk_size - config.chunk_overlap):
-                        chunk_content = content[i:i + chunk_size]
-                        if chunk_content.strip():
-                            chunks.append(chunk_content)
-                    
-                    total_chunks += len(chunks)
-                    
-                    # Generate embeddings for chunks
-                    for chunk_index, chunk_content in enumerate(chunks):
-                        try:
-                            embedding = sentence_model.encode(chunk_content).tolist()
-                            
-                            chunk_doc = CodeChunk(
-                                file_path=relative_path,
-                                chunk_content=chunk_content,
-                                chunk_index=chunk_index,
-                                total_chunks=len(chunks),
-                                language=features["language"],
-                                function_name=features["function_name"],
-                                class_name=features["class_name"],
-                                imports=features["imports"],
-                                complexity_score=features["complexity_score"],
-                                embedding=embedding
-                            )
-                            
-                            # Store in MongoDB
-                            await db.code_chunks.insert_one(chunk_doc.dict())
-                            processed_chunks += 1
-                            
-                        except Exception as e:
-                            logging.error(f"Failed to process chunk {chunk_index} of {relative_path}: {str(e)}")
-                    
-                    processed_files += 1
-                    
-                    # Update progress
-                    if processed_files % 10 == 0:
-                        vectorizer_status["details"].append(f"Processed {processed_files}/{len(all_files)} files")
-                    
+                    await index_chunks_in_pgvector(config, chunk_ids, pending_chunks, embeddings)
+                    vectorizer_status["details"].append(f"Indexed {len(chunk_ids)} chunks in pgvector")
+                    pgvector_mirrored = True
                 except Exception as e:
-                    failed_files += 1
-                    logging.error(f"Failed to process file {file_path}: {str(e)}")
+                    logging.error(f"Failed to index chunks in pgvector: {str(e)}")
+            
+            # Once this run has fully landed, drop what earlier runs stored for the repository so
+            # search doesn't return every chunk once per run, and shrink the sidecar to match
+            run_complete = processed_chunks == len(chunk_docs)
+            if run_complete:
+                removed, pgvector_clean = await remove_stale_chunks(config, config.target_repository, run_id)
+                pgvector_mirrored = pgvector_mirrored and pgvector_clean
+                if removed:
+                    vectorizer_status["details"].append(f"Removed {removed} chunks from earlier runs")
+                    try:
+                        await compact_vector_store(sentence_model.get_sentence_embedding_dimension())
+                    except Exception as e:
+                        logging.error(f"Failed to compact vector store: {str(e)}")
             
             # Calculate final statistics
             end_time = datetime.now()
@@ -581,8 +1065,13 @@ async def clone_and_process_repository(config: ServiceConfig) -> EnhancedVectori
                 ]
             )
             
-            # Store status in database
-            await db.vectorization_status.insert_one(final_status.dict())
+            # Store status in database, with the run pgvector now mirrors (if any) for pgvector_ready
+            await store_vectorization_status(config.target_repository, final_status)
+            await db.vectorization_status.update_one(
+                {"repository": config.target_repository},
+                {"$set": {"run_id": run_id, "pgvector_run_id": run_id if pgvector_mirrored and run_complete else None}}
+            )
+            pgvector_probe["checked_at"] = None
             vectorizer_status = final_status.dict()
             
             return final_status
@@ -600,7 +1089,7 @@ async def clone_and_process_repository(config: ServiceConfig) -> EnhancedVectori
             details=[f"Vectorization failed: {str(e)}"]
         )
         
-        await db.vectorization_status.insert_one(error_status.dict())
+        await store_vectorization_status(config.target_repository, error_status)
         vectorizer_status = error_status.dict()
         
         return error_status
@@ -609,90 +1098,596 @@ async def fetch_jira_ticket_details(config: ServiceConfig, ticket_id: str) -> Di
     """Fetch detailed information from JIRA ticket"""
     try:
         if not config.jira_username or not config.jira_token:
-            return {"summary": f"Mock ticket {ticket_id}", "description": "JIRA not configured"}
+            return {"summary": f"Mock ticket {ticket_id}", "description": "JIRA not configured", "placeholder": True}
         
-        import base64
-        credentials = base64.b64encode(f"{config.jira_username}:{config.jira_token}".encode()).decode()
-        headers = {"Authorization": f"Basic {credentials}"}
+        headers = config.jira_headers
         
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(
-                f"{config.jira_url}/rest/api/2/issue/{ticket_id}",
-                headers=headers
-            )
+        response = await http_client.get(
+            f"{config.jira_url}/rest/api/2/issue/{ticket_id}",
+            headers=headers
+        )
+        
+        if response.status_code == 200:
+            issue_data = response.json()
+            return {
+                "summary": issue_data["fields"]["summary"],
+                "description": issue_data["fields"]["description"] or "",
+                "issue_type": issue_data["fields"]["issuetype"]["name"],
+                "priority": issue_data["fields"]["priority"]["name"],
+                "status": issue_data["fields"]["status"]["name"]
+            }
+        else:
+            return {"summary": f"Ticket {ticket_id}", "description": "Could not fetch from JIRA", "placeholder": True}
             
-            if response.status_code == 200:
-                issue_data = response.json()
-                return {
-                    "summary": issue_data["fields"]["summary"],
-                    "description": issue_data["fields"]["description"] or "",
-                    "issue_type": issue_data["fields"]["issuetype"]["name"],
-                    "priority": issue_data["fields"]["priority"]["name"],
-                    "status": issue_data["fields"]["status"]["name"]
-                }
-            else:
-                return {"summary": f"Ticket {ticket_id}", "description": "Could not fetch from JIRA"}
-                
     except Exception as e:
         logging.error(f"Failed to fetch JIRA ticket {ticket_id}: {str(e)}")
-        return {"summary": f"Ticket {ticket_id}", "description": "Error fetching from JIRA"}
+        return {"summary": f"Ticket {ticket_id}", "description": "Error fetching from JIRA", "placeholder": True}
+
+def pgvector_enabled(config: ServiceConfig) -> bool:
+    """pgvector search needs a configured Postgres"""
+    return bool(config.postgres_password)
+
+async def pgvector_ready(config: ServiceConfig) -> bool:
+    """Whether search should use pgvector: Postgres answers, the table exists, and it holds the current chunk run"""
+    if not pgvector_enabled(config):
+        return False
+    key = (config.postgres_host, config.postgres_port, config.postgres_db, config.postgres_user,
+           config.postgres_password, config.target_repository)
+    if pgvector_probe["key"] == key and pgvector_probe["checked_at"] is not None:
+        if pgvector_probe["failures"]:
+            wait = min(PGVECTOR_RETRY_MAX, PGVECTOR_RETRY_MIN * 2 ** (pgvector_probe["failures"] - 1))
+        else:
+            wait = PGVECTOR_PROBE_TTL
+        if time.monotonic() - pgvector_probe["checked_at"] < wait:
+            return pgvector_probe["ready"]
+    # Searches don't queue behind a probe that is waiting on an unreachable server
+    if pgvector_probe_lock.locked():
+        return pgvector_probe["key"] == key and pgvector_probe["ready"]
+    async with pgvector_probe_lock:
+        failures = pgvector_probe["failures"] if pgvector_probe["key"] == key else 0
+        try:
+            pool = await get_pg_pool(config)
+            table_exists = await pool.fetchval("SELECT to_regclass('public.code_chunks') IS NOT NULL", timeout=2.0)
+            status = await db.vectorization_status.find_one(
+                {"repository": config.target_repository}, {"_id": 0, "run_id": 1, "pgvector_run_id": 1}
+            )
+            ready = bool(table_exists and status and status.get("run_id") and status.get("pgvector_run_id") == status["run_id"])
+            failures = 0
+        except Exception as e:
+            logging.warning(f"pgvector unavailable, using in-memory search: {str(e)}")
+            ready = False
+            failures += 1
+        pgvector_probe.update(key=key, ready=ready, checked_at=time.monotonic(), failures=failures)
+        return ready
+
+def pgvector_failed():
+    """Stop sending searches to pgvector until the next probe"""
+    pgvector_probe.update(ready=False, checked_at=time.monotonic(), failures=pgvector_probe["failures"] + 1)
+
+def to_pgvector(embedding) -> str:
+    """Format an embedding as a pgvector text literal"""
+    return "[" + ",".join(f"{x:.7g}" for x in embedding) + "]"
+
+async def index_chunks_in_pgvector(config: ServiceConfig, chunk_ids: List[str], chunks: List[tuple], embeddings: np.ndarray):
+    """Store chunk vectors in the pgvector code_chunks table, creating it and its HNSW index if needed"""
+    pool = await get_pg_pool(config)
+    async with pool.acquire() as conn:
+        await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        await conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS code_chunks (
+                id text PRIMARY KEY,
+                file_path text NOT NULL,
+                chunk_index integer NOT NULL,
+                embedding vector({embeddings.shape[1]}) NOT NULL
+            )
+        """)
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS code_chunks_embedding_hnsw ON code_chunks USING hnsw (embedding vector_cosine_ops)"
+        )
+        records = [
+            (chunk_id, chunk[0], chunk[1], to_pgvector(embedding))
+            for chunk_id, chunk, embedding in zip(chunk_ids, chunks, embeddings)
+        ]
+        for start in range(0, len(records), CHUNK_INSERT_BATCH_SIZE):
+            await conn.executemany(
+                "INSERT INTO code_chunks (id, file_path, chunk_index, embedding) VALUES ($1, $2, $3, $4::vector) "
+                "ON CONFLICT (id) DO NOTHING",
+                records[start:start + CHUNK_INSERT_BATCH_SIZE]
+            )
+
+async def pgvector_search(config: ServiceConfig, query_embedding: np.ndarray, limit: int) -> List[Dict[str, Any]]:
+    """Find the nearest chunks with the pgvector HNSW index, then load their documents from MongoDB"""
+    pool = await get_pg_pool(config)
+    rows = await pool.fetch(
+        "SELECT id, 1 - (embedding <=> $1::vector) AS similarity FROM code_chunks "
+        "ORDER BY embedding <=> $1::vector LIMIT $2",
+        to_pgvector(query_embedding), limit, timeout=5.0
+    )
+    docs = {}
+    async for chunk in db.code_chunks.find({"id": {"$in": [row["id"] for row in rows]}}, {"embedding": 0}):
+        docs[chunk["id"]] = chunk
+    return [{"chunk": docs[row["id"]], "similarity": float(row["similarity"])} for row in rows if row["id"] in docs]
+
+async def load_search_index() -> Dict[str, Any]:
+    """Return the in-memory search matrix, reloading it when code_chunks has changed"""
+    # Local inserts bump the version; the document count catches writes from other processes
+    version = (code_chunks_version, await db.code_chunks.estimated_document_count())
+    async with search_index_lock:
+        if search_index["version"] != version:
+            store_id, store = open_vector_store(sentence_model.get_sentence_embedding_dimension()) or (None, None)
+            chunks = []
+            rows = []
+            missing = []
+            # Vectors come from the sidecar where possible; chunks without a usable row (older data,
+            # or a sidecar that was lost or recreated since) fall back to the embedding stored in MongoDB
+            async for chunk in db.code_chunks.find({"embedding": {"$ne": None}}, {"embedding": 0}):
+                row = chunk.get("vector_row")
+                if store is not None and row is not None and chunk.get("vector_store_id") == store_id and row < len(store):
+                    rows.append(row)
+                    chunks.append(chunk)
+                else:
+                    missing.append(chunk["id"])
+            
+            embeddings = [store[rows]] if rows else []
+            for start in range(0, len(missing), EMBEDDING_CACHE_LOOKUP_BATCH):
+                batch = missing[start:start + EMBEDDING_CACHE_LOOKUP_BATCH]
+                async for chunk in db.code_chunks.find({"id": {"$in": batch}}):
+                    embedding = decode_embedding(chunk.pop("embedding"))
+                    if embedding.size:
+                        embeddings.append(embedding[np.newaxis])
+                        chunks.append(chunk)
+            
+            if embeddings:
+                # New chunks are stored unit-length already; this one-off pass per reload covers
+                # chunks from before that change and float16 rounding
+                matrix = np.concatenate(embeddings).astype(np.float32, copy=False)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                matrix /= norms
+            else:
+                matrix = None
+            
+            search_index.update(
+                version=version, layout=search_index["layout"] + 1, matrix=matrix, buffer=matrix,
+                codes=None, hnsw=None, hnsw_rows=0, chunks=chunks
+            )
+            schedule_hnsw_build()
+        return search_index
+
+async def extend_search_index(previous_version: tuple, chunks: List[Dict[str, Any]], embeddings: np.ndarray):
+    """Append chunks this process just stored to an up-to-date search index instead of reloading it"""
+    async with search_index_lock:
+        if search_index["version"] != previous_version:
+            return  # stale or never loaded; the next search reloads it
+        
+        count = len(search_index["chunks"])
+        buffer = search_index["buffer"]
+        if buffer is not None and buffer.shape[1] != embeddings.shape[1]:
+            return
+        # Spare rows are allocated by doubling so repeated ingestion doesn't copy the whole matrix each time
+        if buffer is None or count + len(chunks) > len(buffer):
+            grown = np.empty((max(2 * count, count + len(chunks)), embeddings.shape[1]), dtype=np.float32)
+            if count:
+                grown[:count] = buffer[:count]
+            buffer = grown
+        buffer[count:count + len(chunks)] = embeddings
+        
+        search_index.update(
+            version=(code_chunks_version, await db.code_chunks.estimated_document_count()),
+            matrix=buffer[:count + len(chunks)],
+            buffer=buffer,
+            codes=None,
+            chunks=search_index["chunks"] + chunks
+        )
+        # The existing graph still covers the old rows; the maintenance task inserts the new ones
+        schedule_hnsw_build()
+
+# Above this many chunks, search uses an HNSW graph when hnswlib is installed, otherwise it
+# prefilters on sign-bit codes of the embeddings; either way candidates are rescored exactly
+ANN_SEARCH_MIN_CHUNKS = 50000
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+HNSW_THREADS = int(os.environ.get('HNSW_THREADS', max(1, (os.cpu_count() or 2) // 2)))
+BINARY_RERANK_MIN = 4096
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def binary_codes(embeddings: np.ndarray) -> np.ndarray:
+    """Pack the sign bit of every dimension, 1 bit per dimension"""
+    codes = np.packbits(embeddings > 0, axis=-1)
+    # Wider words mean fewer XOR/popcount operations per row
+    return codes.view(np.uint64) if codes.shape[-1] % 8 == 0 else codes
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def hamming_kernel(codes, query_code):
+        """XOR and popcount fused per row, without the temporary arrays NumPy allocates"""
+        n, words = codes.shape
+        out = np.empty(n, np.uint32)
+        for i in prange(n):
+            total = 0
+            for j in range(words):
+                x = codes[i, j] ^ query_code[j]
+                x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+                x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+                x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+                total += (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+            out[i] = total
+        return out
 
-async def semantic_code_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    if njit is not None and codes.dtype == np.uint64:
+        return hamming_kernel(codes, query_code)
+    xor = codes ^ query_code
+    if hasattr(np, "bitwise_count"):  # NumPy 2.0+
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.uint32)
+    return POPCOUNT_TABLE[xor.view(np.uint8)].sum(axis=1, dtype=np.uint32)
+
+async def collect_batch(queue: asyncio.Queue, max_batch: int, max_delay: float) -> list:
+    """Wait for one queued item, then collect whatever else arrives within the batching window"""
+    batch = [await queue.get()]
+    deadline = asyncio.get_running_loop().time() + max_delay
+    while len(batch) < max_batch:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+def encode_queries(texts: List[str]) -> np.ndarray:
+    """Unit-length float32 embeddings for a batch of queries"""
+    with inference_context():
+        return sentence_model.encode(
+            texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        ).astype(np.float32)
+
+class QueryEncoder:
+    """Coalesces concurrent query embeddings into one batched encode call off the event loop"""
+    
+    def __init__(self, max_batch: int = 32, max_delay: float = 0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._encode_loop())
+    
+    async def stop(self):
+        """Stop the batching loop and encode anything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        batch = []
+        while self.queue is not None and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._encode(batch)
+    
+    async def encode(self, text: str) -> np.ndarray:
+        if self._task is None:
+            return (await asyncio.get_running_loop().run_in_executor(embedding_executor, encode_queries, [text]))[0]
+        done = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, done))
+        return await done
+    
+    async def _encode_loop(self):
+        while True:
+            await self._encode(await collect_batch(self.queue, self.max_batch, self.max_delay))
+    
+    async def _encode(self, batch):
+        try:
+            embeddings = await asyncio.get_running_loop().run_in_executor(
+                embedding_executor, encode_queries, [text for text, _ in batch]
+            )
+        except Exception as e:
+            for _, done in batch:
+                if not done.done():
+                    done.set_exception(e)
+            return
+        for (_, done), embedding in zip(batch, embeddings):
+            if not done.done():
+                done.set_result(embedding)
+
+query_encoder = QueryEncoder()
+
+def build_hnsw_index(matrix: np.ndarray):
+    index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+    index.init_index(max_elements=len(matrix), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+    index.add_items(matrix, np.arange(len(matrix)), num_threads=HNSW_THREADS)
+    index.set_ef(HNSW_EF_SEARCH)
+    return index
+
+def extend_hnsw_index(index, matrix: np.ndarray, covered: int):
+    """Insert the rows after the first covered ones; the existing graph is left as it is"""
+    index.add_items(matrix[covered:], np.arange(covered, len(matrix)), num_threads=HNSW_THREADS)
+
+async def maintain_hnsw_index():
+    """Build the HNSW graph for the search matrix in a worker thread, then insert new rows as they arrive"""
+    while True:
+        layout, matrix = search_index["layout"], search_index["matrix"]
+        if hnswlib is None or matrix is None or len(matrix) < ANN_SEARCH_MIN_CHUNKS:
+            return
+        graph, covered = search_index["hnsw"], search_index["hnsw_rows"]
+        if graph is not None and covered == len(matrix):
+            return
+        try:
+            if graph is None:
+                graph = await asyncio.to_thread(build_hnsw_index, matrix)
+            else:
+                if len(matrix) > graph.get_max_elements():
+                    # Resizing isn't safe alongside queries, so it runs here between searches rather than in
+                    # the thread; add_items and knn_query may overlap
+                    graph.resize_index(max(2 * graph.get_max_elements(), len(matrix)))
+                await asyncio.to_thread(extend_hnsw_index, graph, matrix, covered)
+        except Exception as e:
+            logging.error(f"Failed to build HNSW index: {str(e)}")
+            return
+        # A full reload meanwhile reordered the rows, so the graph's labels no longer match
+        if search_index["layout"] == layout:
+            search_index.update(hnsw=graph, hnsw_rows=len(matrix))
+            logging.info(f"HNSW index covers {len(matrix)} chunks")
+
+def schedule_hnsw_build():
+    global hnsw_build_task
+    if hnswlib is not None and (hnsw_build_task is None or hnsw_build_task.done()):
+        hnsw_build_task = asyncio.create_task(maintain_hnsw_index())
+
+async def embed_query(query: str) -> np.ndarray:
+    """Unit-length float32 embedding of a search query"""
+    await init_sentence_model()
+    return await query_encoder.encode(query)
+
+async def semantic_code_search(query: str, limit: int = 5, query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
     """Perform semantic search on code chunks"""
     try:
-        await init_sentence_model()
+        # Generate query embedding unless the caller already has one
+        if query_embedding is None:
+            query_embedding = await embed_query(query)
         
-        # Generate query embedding
-        query_embedding = sentence_model.encode(query).tolist()
+        config = await get_config()
+        if await pgvector_ready(config):
+            try:
+                results = await pgvector_search(config, query_embedding, limit)
+                if results:
+                    return results
+            except Exception as e:
+                logging.warning(f"pgvector search unavailable, using in-memory search: {str(e)}")
+                pgvector_failed()
         
-        # Find similar code chunks (simplified - in production use vector database)
-        chunks = await db.code_chunks.find().to_list(1000)  # Limited for demo
+        index = await load_search_index()
+        if index["matrix"] is None:
+            return []
         
-        similarities = []
-        for chunk in chunks:
-            if chunk.get("embedding"):
-                # Calculate cosine similarity
-                embedding = np.array(chunk["embedding"])
-                query_emb = np.array(query_embedding)
-                similarity = np.dot(embedding, query_emb) / (np.linalg.norm(embedding) * np.linalg.norm(query_emb))
-                similarities.append((chunk, similarity))
+        matrix = index["matrix"]
+        graph = index["hnsw"]
+        rerank = max(4 * limit, BINARY_RERANK_MIN)
+        if graph is not None:
+            # Rows the graph doesn't cover yet are scanned exactly; ones being inserted right now can
+            # come back from both, hence the dedup
+            covered = index["hnsw_rows"]
+            labels, _ = graph.knn_query(query_embedding, k=min(limit, covered))
+            candidates = np.unique(np.concatenate([labels[0].astype(np.int64), np.arange(covered, len(matrix))]))
+            scores = matrix[candidates] @ query_embedding
+        elif len(matrix) >= ANN_SEARCH_MIN_CHUNKS and rerank < len(matrix):
+            # Scanning 1 bit per dimension moves 32x less memory than the float32 matrix
+            if index["codes"] is None:
+                index["codes"] = binary_codes(matrix)
+            distances = hamming_distances(index["codes"], binary_codes(query_embedding))
+            candidates = np.argpartition(distances, rerank)[:rerank]
+            scores = matrix[candidates] @ query_embedding
+        else:
+            candidates = np.arange(len(matrix))
+            # Cosine similarity against every chunk at once; rows and query are unit length
+            scores = matrix @ query_embedding
         
-        # Sort by similarity and return top results
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return [{"chunk": chunk, "similarity": float(sim)} for chunk, sim in similarities[:limit]]
+        # Only fully sort the top results
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [{"chunk": index["chunks"][candidates[i]], "similarity": float(scores[i])} for i in top]
         
     except Exception as e:
         logging.error(f"Semantic search failed: {str(e)}")
         return []
 
+async def stream_code_with_ollama(config: ServiceConfig, prompt: str):
+    """Yield generated text from OLLAMA as it is produced"""
+    async with http_client.stream(
+        "POST",
+        f"{config.ollama_url}/api/generate",
+        json={
+            "model": config.ollama_model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "temperature": 0.2,
+                "top_p": 0.9,
+                "num_predict": 500
+            }
+        },
+        timeout=60.0
+    ) as response:
+        if response.status_code != 200:
+            yield "# Error generating code with OLLAMA"
+            return
+        
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            piece = orjson.loads(line).get("response", "")
+            if piece:
+                yield piece
+
 async def generate_code_with_ollama(config: ServiceConfig, prompt: str) -> str:
     """Generate code using OLLAMA"""
     try:
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{config.ollama_url}/api/generate",
-                json={
-                    "model": config.ollama_model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.2,
-                        "top_p": 0.9,
-                        "num_predict": 500
-                    }
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                return "# Error generating code with OLLAMA"
-                
+        return "".join([piece async for piece in stream_code_with_ollama(config, prompt)])
     except Exception as e:
         logging.error(f"OLLAMA generation failed: {str(e)}")
         return f"# Error: {str(e)}"
 
+SUGGESTION_CACHE_SIZE = 512
+SUGGESTION_CACHE_TTL = 3600.0
+SUGGESTION_CACHE_THRESHOLD = 0.92
+
+class SemanticSuggestionCache:
+    """Reuses search results (and, for the same ticket, generated code) for tickets whose text embeds close to an earlier one.
+    
+    Cached query embeddings are kept as rows of one float32 matrix so a lookup is a single matmul.
+    """
+    
+    def __init__(self, max_size: int = SUGGESTION_CACHE_SIZE, ttl: float = SUGGESTION_CACHE_TTL,
+                 threshold: float = SUGGESTION_CACHE_THRESHOLD):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        # Capacity grows by doubling; only the first `size` rows are live
+        self.matrix: Optional[np.ndarray] = None
+        self.lock = asyncio.Lock()
+        self.clear()
+    
+    async def get(self, query_embedding: np.ndarray, model: str) -> Optional[Any]:
+        async with self.lock:
+            if not self.size:
+                return None
+            now = time.monotonic()
+            scores = self.matrix[:self.size] @ query_embedding
+            # Only entries generated by the same model and still within the TTL can match
+            scores[(now - self.created[:self.size]) > self.ttl] = -np.inf
+            scores[[i for i, entry_model in enumerate(self.models) if entry_model != model]] = -np.inf
+            idx = int(np.argmax(scores))
+            if scores[idx] < self.threshold:
+                return None
+            self.last_used[idx] = now
+            return self.values[idx]
+    
+    async def put(self, query_embedding: np.ndarray, model: str, value: Any):
+        async with self.lock:
+            now = time.monotonic()
+            if self.size >= self.max_size:
+                # Replace an expired entry if there is one, otherwise the least recently used
+                expired = np.flatnonzero((now - self.created[:self.size]) > self.ttl)
+                idx = int(expired[0]) if expired.size else int(np.argmin(self.last_used[:self.size]))
+            else:
+                if self.matrix is None or self.size == len(self.matrix):
+                    self._grow(len(query_embedding))
+                idx = self.size
+                self.size += 1
+                self.models.append(model)
+                self.values.append(value)
+            self.matrix[idx] = query_embedding
+            self.models[idx] = model
+            self.values[idx] = value
+            self.created[idx] = self.last_used[idx] = now
+    
+    def clear(self):
+        self.matrix = None
+        self.size = 0
+        self.models = []
+        self.values = []
+        self.created = np.zeros(0)
+        self.last_used = np.zeros(0)
+    
+    def _grow(self, dimension: int):
+        capacity = min(self.max_size, max(8, 2 * self.size))
+        matrix = np.zeros((capacity, dimension), dtype=np.float32)
+        created = np.zeros(capacity)
+        last_used = np.zeros(capacity)
+        if self.matrix is not None:
+            matrix[:self.size] = self.matrix[:self.size]
+            created[:self.size] = self.created[:self.size]
+            last_used[:self.size] = self.last_used[:self.size]
+        self.matrix, self.created, self.last_used = matrix, created, last_used
+
+suggestion_cache = SemanticSuggestionCache()
+
+class SuggestionWriter:
+    """Buffers suggestion documents and persists them with batched insert_many calls"""
+    
+    def __init__(self, max_batch: int = 100, max_delay: float = 0.05):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self.queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the flush loop and write anything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        batch = []
+        while self.queue is not None and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._write(batch)
+    
+    async def submit(self, document: Dict[str, Any]):
+        """Queue a document and wait until its batch has been written"""
+        if self._task is None:
+            async with analytics_counters_lock:
+                await db.advanced_code_suggestions.insert_one(document)
+                await increment_analytics_counters([document])
+            return
+        done = asyncio.get_running_loop().create_future()
+        await self.queue.put((document, done))
+        await done
+    
+    async def _flush_loop(self):
+        while True:
+            await self._write(await collect_batch(self.queue, self.max_batch, self.max_delay))
+    
+    async def _write(self, batch):
+        documents = [doc for doc, _ in batch]
+        failed = {}
+        # Held across both writes so a counter rebuild never sees a batch stored but not yet counted
+        async with analytics_counters_lock:
+            try:
+                await db.advanced_code_suggestions.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Unordered, so every document that didn't fail itself was stored
+                failed = {error["index"]: e for error in e.details.get("writeErrors", [])}
+                logging.error(f"Failed to store {len(failed)} of {len(batch)} suggestions")
+            except Exception as e:
+                logging.error(f"Failed to store {len(batch)} suggestions: {str(e)}")
+                failed = dict.fromkeys(range(len(batch)), e)
+            # Only stored suggestions are counted, once the insert has resolved
+            stored = [doc for i, doc in enumerate(documents) if i not in failed]
+            if stored:
+                try:
+                    await increment_analytics_counters(stored)
+                except Exception as e:
+                    logging.error(f"Failed to update analytics counters: {str(e)}")
+        for i, (_, done) in enumerate(batch):
+            if done.done():
+                continue
+            if i in failed:
+                done.set_exception(failed[i])
+            else:
+                done.set_result(None)
+
+suggestion_writer = SuggestionWriter()
+
 # Enhanced API Routes
 @api_router.get("/config", response_model=ServiceConfig)
 async def get_configuration():
@@ -710,43 +1705,77 @@ async def update_configuration(config_update: ConfigUpdate):
         setattr(current_config, key, value)
     
     current_config.created_at = datetime.utcnow()
-    await db.service_config.insert_one(current_config.dict())
+    await db.service_config.update_one(
+        {"_id": CONFIG_DOC_ID},
+        {"$set": update_dict | {"created_at": current_config.created_at}},
+        upsert=True
+    )
+    store_config_cache(current_config)
     
     return current_config
 
+# Service checks in the order /status/all reports them
+STATUS_CHECKS = {
+    "ollama": check_ollama_connection,
+    "gitlab": check_gitlab_connection,
+    "jira": check_jira_connection,
+    "postgres": check_postgres_connection
+}
+
+async def run_status_check(service: str, config: ServiceConfig) -> ConnectionStatus:
+    """Run one service check, bounded so a hung service can't stall the caller"""
+    try:
+        return await asyncio.wait_for(STATUS_CHECKS[service](config), timeout=STATUS_CHECK_TIMEOUT)
+    except asyncio.TimeoutError:
+        return ConnectionStatus(
+            service=service,
+            status="timeout",
+            message=f"No response within {STATUS_CHECK_TIMEOUT:g}s",
+            response_time_ms=STATUS_CHECK_TIMEOUT * 1000
+        )
+    except Exception as e:
+        return ConnectionStatus(
+            service=service,
+            status="error",
+            message=f"Unexpected error: {str(e)}"
+        )
+
+async def iter_connection_statuses(config: ServiceConfig):
+    """Run all service checks concurrently and yield each status as soon as it completes"""
+    tasks = [asyncio.create_task(run_status_check(service, config)) for service in STATUS_CHECKS]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Don't leave checks running if the client went away mid-stream
+        for task in tasks:
+            task.cancel()
+
+@api_router.get("/status/stream")
+async def stream_all_connections():
+    """Stream connection status for all services as newline-delimited JSON, fastest first"""
+    config = await get_config()
+    
+    async def generate():
+        async for status in iter_connection_statuses(config):
+            yield orjson.dumps(status.dict()) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @api_router.get("/status/all", response_model=List[ConnectionStatus])
 async def check_all_connections():
     """Check connection status for all services"""
     config = await get_config()
     
-    # Run all checks concurrently
-    tasks = [
-        check_ollama_connection(config),
-        check_gitlab_connection(config),
-        check_jira_connection(config),
-        check_postgres_connection(config)
-    ]
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Handle any exceptions
-    statuses = []
-    for i, result in enumerate(results):
-        if isinstance(result, Exception):
-            service_names = ["ollama", "gitlab", "jira", "postgres"]
-            statuses.append(ConnectionStatus(
-                service=service_names[i],
-                status="error",
-                message=f"Unexpected error: {str(result)}"
-            ))
-        else:
-            statuses.append(result)
-    
-    return statuses
+    # The response is only as fast as the slowest check, but each one is capped at STATUS_CHECK_TIMEOUT
+    # and maps its own failures to an error status. Clients that want results as they arrive can use
+    # /status/stream instead.
+    return await asyncio.gather(*[run_status_check(service, config) for service in STATUS_CHECKS])
 
 @api_router.get("/status/{service}", response_model=ConnectionStatus)
 async def check_service_connection(service: str):
     """Check connection status for a specific service"""
+    logging.warning(f"/api/status/{service} is deprecated for polling; use /api/status/all to check every service in one request")
     config = await get_config()
     
     if service == "ollama":
@@ -778,28 +1807,25 @@ async def vectorize_repository(background_tasks: BackgroundTasks):
         "estimated_time": "5-15 minutes depending on repository size"
     }
 
+# Fields that status documents written by older versions may lack
+VECTORIZATION_STATUS_DEFAULTS = {"total_chunks": 0, "processed_chunks": 0, "file_types": {}, "error_details": []}
+
 @api_router.get("/vectorize/status", response_model=EnhancedVectorizationStatus)
 async def get_vectorization_status():
     """Get current enhanced vectorization status"""
     global vectorizer_status
     
+    # The in-memory status is validated; only complete documents from MongoDB skip it
     if isinstance(vectorizer_status, dict) and vectorizer_status.get("status") != "not_started":
         return EnhancedVectorizationStatus(**vectorizer_status)
     
-    # Check database for latest status
-    status_doc = await db.vectorization_status.find_one({}, sort=[("last_updated", -1)])
+    # Check database for latest status; MongoDB drops the ObjectId field server-side
+    status_doc = await db.vectorization_status.find_one(
+        {}, sort=[("last_updated", -1)], projection={"_id": 0, "details": {"$slice": -20}}
+    )
     if status_doc:
-        # Remove MongoDB ObjectId field
-        if "_id" in status_doc:
-            del status_doc["_id"]
-        
         # Add missing fields with defaults if they don't exist
-        status_doc.setdefault("total_chunks", 0)
-        status_doc.setdefault("processed_chunks", 0)
-        status_doc.setdefault("file_types", {})
-        status_doc.setdefault("error_details", [])
-        
-        return EnhancedVectorizationStatus(**status_doc)
+        return EnhancedVectorizationStatus.model_construct(**(VECTORIZATION_STATUS_DEFAULTS | status_doc))
     
     return EnhancedVectorizationStatus(
         status="not_started",
@@ -818,30 +1844,29 @@ async def get_ollama_models():
     config = await get_config()
     
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(f"{config.ollama_url}/api/tags")
+        response = await http_client.get(f"{config.ollama_url}/api/tags")
+        
+        if response.status_code == 200:
+            models_data = response.json()
+            models = models_data.get("models", [])
+            model_names = [model.get("name", "").split(":")[0] for model in models]
+            # Remove duplicates and empty names
+            unique_models = list(set([name for name in model_names if name]))
+            
+            return {
+                "status": "success",
+                "models": unique_models,
+                "total_models": len(unique_models),
+                "ollama_url": config.ollama_url
+            }
+        else:
+            return {
+                "status": "error",
+                "message": f"Failed to fetch models from OLLAMA: HTTP {response.status_code}",
+                "models": [],  # No fallback models - only show what's actually available
+                "ollama_url": config.ollama_url
+            }
             
-            if response.status_code == 200:
-                models_data = response.json()
-                models = models_data.get("models", [])
-                model_names = [model.get("name", "").split(":")[0] for model in models]
-                # Remove duplicates and empty names
-                unique_models = list(set([name for name in model_names if name]))
-                
-                return {
-                    "status": "success",
-                    "models": unique_models,
-                    "total_models": len(unique_models),
-                    "ollama_url": config.ollama_url
-                }
-            else:
-                return {
-                    "status": "error",
-                    "message": f"Failed to fetch models from OLLAMA: HTTP {response.status_code}",
-                    "models": [],  # No fallback models - only show what's actually available
-                    "ollama_url": config.ollama_url
-                }
-                
     except Exception as e:
         logging.error(f"Failed to fetch OLLAMA models: {str(e)}")
         return {
@@ -850,35 +1875,25 @@ async def get_ollama_models():
             "models": [],  # No fallback models - only show what's actually available
             "ollama_url": config.ollama_url
         }
-@api_router.post("/suggest/code", response_model=AdvancedCodeSuggestion)
-async def suggest_code_advanced(ticket_input: JIRATicketInput):
-    """Generate enhanced code suggestions for a JIRA ticket"""
-    start_time = datetime.now()
-    config = await get_config()
-    
-    # Use provided model or fall back to config default
-    selected_model = ticket_input.model or config.ollama_model
-    
-    try:
-        # Fetch JIRA ticket details
-        ticket_details = await fetch_jira_ticket_details(config, ticket_input.ticket_id)
-        
-        # Perform semantic search for relevant code
-        search_query = f"{ticket_details['summary']} {ticket_details['description']}"
-        similar_chunks = await semantic_code_search(search_query, limit=5)
-        
-        # Build RAG prompt
-        context_code = "\n\n".join([
-            f"# File: {chunk['chunk']['file_path']}\n{chunk['chunk']['chunk_content']}"
-            for chunk in similar_chunks[:3]
-        ])
-        
-        rag_prompt = f"""
+# Suggestion writes still in flight; holding a reference keeps the tasks from being garbage collected
+pending_writes = set()
+
+async def store_suggestion(document: Dict[str, Any]):
+    """Persist a suggestion and refresh analytics once it is stored"""
+    await suggestion_writer.submit(document)
+    invalidate_analytics_cache()
+
+def finished_write(task: asyncio.Task):
+    pending_writes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Failed to store code suggestion: {str(task.exception())}")
+
+RAG_PROMPT_TEMPLATE = """
 You are an expert Ansible developer. Based on the JIRA ticket and similar code examples, suggest code changes.
 
-JIRA Ticket: {ticket_input.ticket_id}
-Summary: {ticket_details['summary']}
-Description: {ticket_details['description']}
+JIRA Ticket: {ticket_id}
+Summary: {summary}
+Description: {description}
 
 Similar code examples:
 {context_code}
@@ -891,14 +1906,63 @@ Please provide:
 Generate Ansible-compatible Python or YAML code:
 """
 
-        # Generate code with OLLAMA using selected model
-        # Create a temporary config with the selected model
-        temp_config = config.copy()
-        temp_config.ollama_model = selected_model
-        generated_code = await generate_code_with_ollama(temp_config, rag_prompt)
+def build_rag_prompt(ticket_id: str, ticket_details: Dict[str, Any], similar_chunks: List[Dict[str, Any]]) -> str:
+    """Build the generation prompt from the ticket and the most similar code chunks"""
+    # join() materialises its argument anyway, so a list is cheaper here than a generator
+    context_code = "\n\n".join([
+        f"# File: {chunk['chunk']['file_path']}\n{chunk['chunk']['chunk_content']}"
+        for chunk in similar_chunks[:3]
+    ])
+    
+    return RAG_PROMPT_TEMPLATE.format(
+        ticket_id=ticket_id,
+        summary=ticket_details['summary'],
+        description=ticket_details['description'],
+        context_code=context_code
+    )
+
+@api_router.post("/suggest/code", response_model=AdvancedCodeSuggestion)
+async def suggest_code_advanced(ticket_input: JIRATicketInput, sync: bool = False):
+    """Generate enhanced code suggestions for a JIRA ticket"""
+    timer = Stopwatch()
+    config = await get_config()
+    
+    # Use provided model or fall back to config default
+    selected_model = ticket_input.model or config.ollama_model
+    
+    try:
+        # Fetch JIRA ticket details
+        ticket_details = await fetch_jira_ticket_details(config, ticket_input.ticket_id)
+        
+        # A ticket worded like a recent one reuses its search results; the generated code is only
+        # reused for the same ticket, since the prompt names it. Placeholder details (JIRA missing or
+        # unreachable) differ only by ticket id, so they never go through the cache
+        search_query = f"{ticket_details['summary']} {ticket_details['description']}"
+        query_embedding = await embed_query(search_query)
+        use_cache = not ticket_details.get("placeholder")
+        cached = await suggestion_cache.get(query_embedding, selected_model) if use_cache else None
+        if cached is not None and cached[0] == ticket_input.ticket_id:
+            _, similar_chunks, generated_code = cached
+        else:
+            if cached is not None:
+                similar_chunks = cached[1]
+            else:
+                # Perform semantic search for relevant code
+                similar_chunks = await semantic_code_search(search_query, limit=5, query_embedding=query_embedding)
+            
+            # Build RAG prompt
+            rag_prompt = build_rag_prompt(ticket_input.ticket_id, ticket_details, similar_chunks)
+            
+            # Generate code with OLLAMA using selected model
+            # Create a temporary config with the selected model
+            temp_config = config.copy()
+            temp_config.ollama_model = selected_model
+            generated_code = await generate_code_with_ollama(temp_config, rag_prompt)
+            if use_cache and not generated_code.startswith("# Error"):
+                await suggestion_cache.put(query_embedding, selected_model, (ticket_input.ticket_id, similar_chunks, generated_code))
         
         # Calculate processing time
-        processing_time = (datetime.now() - start_time).total_seconds() * 1000
+        processing_time = timer.elapsed_ms
         
         # Create enhanced suggestion
         suggestion = AdvancedCodeSuggestion(
@@ -922,16 +1986,27 @@ Generate Ansible-compatible Python or YAML code:
             model_used=selected_model
         )
         
-        # Store suggestion
-        await db.advanced_code_suggestions.insert_one(suggestion.dict())
+        # Dump once: the same dict is stored and (via orjson) becomes the response body, so
+        # FastAPI doesn't validate and encode the model a second time
+        document = suggestion.dict()
+        
+        # Store suggestion; unless the caller asked for ?sync=true, the write happens after we respond.
+        # It gets its own dict because the insert adds an ObjectId _id
+        stored = store_suggestion(document | {"created_date": suggestion.created_at.strftime("%Y-%m-%d")})
+        if sync:
+            await stored
+        else:
+            task = asyncio.create_task(stored)
+            pending_writes.add(task)
+            task.add_done_callback(finished_write)
         
-        return suggestion
+        return ORJSONResponse(document)
         
     except Exception as e:
         logging.error(f"Code suggestion failed for {ticket_input.ticket_id}: {str(e)}")
         
         # Return fallback suggestion
-        processing_time = (datetime.now() - start_time).total_seconds() * 1000
+        processing_time = timer.elapsed_ms
         
         return AdvancedCodeSuggestion(
             ticket_id=ticket_input.ticket_id,
@@ -965,6 +2040,29 @@ if __name__ == '__main__':
             model_used=selected_model or "fallback"
         )
 
+@api_router.post("/suggest/code/stream")
+async def suggest_code_stream(ticket_input: JIRATicketInput):
+    """Stream the generated code for a JIRA ticket as plain text while OLLAMA produces it"""
+    config = await get_config()
+    
+    ticket_details = await fetch_jira_ticket_details(config, ticket_input.ticket_id)
+    search_query = f"{ticket_details['summary']} {ticket_details['description']}"
+    similar_chunks = await semantic_code_search(search_query, limit=5)
+    rag_prompt = build_rag_prompt(ticket_input.ticket_id, ticket_details, similar_chunks)
+    
+    stream_config = config.copy()
+    stream_config.ollama_model = ticket_input.model or config.ollama_model
+    
+    async def generate():
+        try:
+            async for piece in stream_code_with_ollama(stream_config, rag_prompt):
+                yield piece
+        except Exception as e:
+            logging.error(f"OLLAMA generation failed: {str(e)}")
+            yield f"\n# Error: {str(e)}"
+    
+    return StreamingResponse(generate(), media_type="text/plain")
+
 @api_router.post("/gitlab/merge-request")
 async def create_enhanced_merge_request(ticket_id: str):
     """Create an enhanced GitLab merge request with suggested code changes"""
@@ -983,7 +2081,7 @@ async def create_enhanced_merge_request(ticket_id: str):
         if not suggestion_doc:
             raise HTTPException(status_code=404, detail="No code suggestion found for this ticket")
         
-        headers = {"Authorization": f"Bearer {config.gitlab_token}"}
+        headers = config.gitlab_headers
         
         # Create branch name
         branch_name = f"feature/{ticket_id.lower()}-automated-suggestion"
@@ -1007,60 +2105,105 @@ async def create_enhanced_merge_request(ticket_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create merge request: {str(e)}")
 
-@api_router.get("/analytics", response_model=AnalyticsData)
-async def get_analytics():
-    """Get system analytics and usage statistics"""
-    try:
-        # Count total suggestions
-        total_suggestions = await db.advanced_code_suggestions.count_documents({})
-        
-        # Calculate average confidence
-        pipeline = [
-            {"$group": {"_id": None, "avg_confidence": {"$avg": "$confidence_score"}}}
-        ]
-        confidence_result = await db.advanced_code_suggestions.aggregate(pipeline).to_list(1)
-        avg_confidence = confidence_result[0]["avg_confidence"] if confidence_result else 0.0
-        
-        # Calculate average processing time
-        pipeline = [
-            {"$group": {"_id": None, "avg_time": {"$avg": "$processing_time_ms"}}}
-        ]
-        time_result = await db.advanced_code_suggestions.aggregate(pipeline).to_list(1)
-        avg_processing_time = time_result[0]["avg_time"] if time_result else 0.0
-        
-        # Get usage by day (last 30 days)
-        from datetime import timedelta
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        pipeline = [
-            {"$match": {"created_at": {"$gte": thirty_days_ago}}},
+def invalidate_analytics_cache():
+    """Drop the cached analytics so the next request recomputes them"""
+    analytics_cache["value"] = None
+    analytics_cache["expires"] = 0.0
+
+ANALYTICS_COUNTERS_ID = "v1"
+ANALYTICS_RECONCILE_INTERVAL = 24 * 60 * 60  # Rebuild counters from source once a day
+ANALYTICS_USAGE_DAYS = 30
+ANALYTICS_REBUILD_ATTEMPTS = 3
+# Serializes this process's suggestion writes with counter rebuilds; increments from other processes
+# are caught by the seq check in rebuild_analytics_counters
+analytics_counters_lock = asyncio.Lock()
+BUG_FIX_PATTERN = re.compile("bug|fix|error", re.IGNORECASE)
+FEATURE_PATTERN = re.compile("feature|new|add", re.IGNORECASE)
+
+def classify_ticket_type(ticket_summary: str) -> str:
+    """Bucket a ticket summary into the types reported by analytics"""
+    if BUG_FIX_PATTERN.search(ticket_summary):
+        return "Bug Fix"
+    if FEATURE_PATTERN.search(ticket_summary):
+        return "Feature"
+    return "Enhancement"
+
+async def increment_analytics_counters(documents: List[Dict[str, Any]]):
+    """Fold newly stored suggestions into the rolling analytics counters"""
+    # seq counts every increment, so a rebuild can tell whether any landed while it was aggregating
+    increments = {"total": 0, "successful": 0, "conf_sum": 0.0, "time_sum": 0.0, "seq": len(documents)}
+    for doc in documents:
+        increments["total"] += 1
+        # Successful suggestions are those with confidence > 0.5
+        if doc["confidence_score"] > 0.5:
+            increments["successful"] += 1
+        increments["conf_sum"] += doc["confidence_score"]
+        increments["time_sum"] += doc["processing_time_ms"]
+        day_key = f"by_day.{doc['created_at'].strftime('%Y-%m-%d')}"
+        increments[day_key] = increments.get(day_key, 0) + 1
+        if doc.get("ticket_summary") is not None:
+            type_key = f"by_type.{classify_ticket_type(doc['ticket_summary'])}"
+            increments[type_key] = increments.get(type_key, 0) + 1
+    
+    await db.analytics_counters.update_one({"_id": ANALYTICS_COUNTERS_ID}, {"$inc": increments}, upsert=True)
+
+async def rebuild_analytics_counters() -> Dict[str, Any]:
+    """Recompute the rolling analytics counters from the stored suggestions.
+    
+    The result only replaces the counters if no increment landed while the aggregation ran;
+    otherwise it is recomputed, up to ANALYTICS_REBUILD_ATTEMPTS times.
+    """
+    for attempt in range(ANALYTICS_REBUILD_ATTEMPTS):
+        async with analytics_counters_lock:
+            current = await db.analytics_counters.find_one({"_id": ANALYTICS_COUNTERS_ID}, {"seq": 1})
+            counters = await aggregate_analytics_counters()
+            # Counters seeded before seq existed match on the missing field
+            seq = current.get("seq") if current else None
+            counters["seq"] = seq or 0
+            try:
+                if current is None:
+                    await db.analytics_counters.insert_one({"_id": ANALYTICS_COUNTERS_ID} | counters)
+                    return counters
+                result = await db.analytics_counters.replace_one({"_id": ANALYTICS_COUNTERS_ID, "seq": seq}, counters)
+                if result.matched_count:
+                    return counters
+            except DuplicateKeyError:
+                pass  # another process seeded the counters meanwhile
+        logging.warning(f"Analytics counters changed during rebuild (attempt {attempt + 1})")
+    return counters
+
+async def aggregate_analytics_counters() -> Dict[str, Any]:
+    """Compute the analytics counters from the stored suggestions"""
+    # Compute every statistic server-side in a single aggregation round-trip
+    pipeline = [{"$facet": {
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                # Successful suggestions are those with confidence > 0.5
+                "successful": {"$sum": {"$cond": [{"$gt": ["$confidence_score", 0.5]}, 1, 0]}},
+                "conf_sum": {"$sum": "$confidence_score"},
+                "time_sum": {"$sum": "$processing_time_ms"}
+            }}
+        ],
+        # Only the usage window is kept, so the counters document doesn't grow with history
+        "by_day": [
+            {"$match": {"created_at": {"$gte": (datetime.utcnow() - timedelta(days=ANALYTICS_USAGE_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)}}},
             {"$group": {
-                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                # created_date is stored at write time; older documents fall back to formatting created_at
+                "_id": {"$ifNull": ["$created_date", {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}]},
                 "count": {"$sum": 1}
-            }},
-            {"$sort": {"_id": 1}}
-        ]
-        usage_result = await db.advanced_code_suggestions.aggregate(pipeline).to_list(30)
-        usage_by_day = {item["_id"]: item["count"] for item in usage_result}
-        
-        # Count successful suggestions (those with confidence > 0.5)
-        successful_suggestions = await db.advanced_code_suggestions.count_documents({
-            "confidence_score": {"$gt": 0.5}
-        })
-        
-        # Count merge requests by checking if we have any merge request records
-        # Since we don't have a separate MR collection, we'll use 0 for now
-        total_merge_requests = 0
-        successful_merge_requests = 0
-        
-        # Get actual ticket types from suggestions if ticket_summary exists
-        pipeline = [
+            }}
+        ],
+        # Actual ticket types from suggestions where ticket_summary exists
+        "by_type": [
             {"$match": {"ticket_summary": {"$exists": True, "$ne": None}}},
             {"$group": {
                 "_id": {"$cond": [
-                    {"$regexMatch": {"input": "$ticket_summary", "regex": "bug|fix|error", "options": "i"}}, 
+                    {"$regexMatch": {"input": "$ticket_summary", "regex": BUG_FIX_PATTERN.pattern, "options": "i"}}, 
                     "Bug Fix",
                     {"$cond": [
-                        {"$regexMatch": {"input": "$ticket_summary", "regex": "feature|new|add", "options": "i"}}, 
+                        {"$regexMatch": {"input": "$ticket_summary", "regex": FEATURE_PATTERN.pattern, "options": "i"}}, 
                         "Feature",
                         "Enhancement"
                     ]}
@@ -1068,50 +2211,138 @@ async def get_analytics():
                 "count": {"$sum": 1}
             }}
         ]
-        ticket_types_result = await db.advanced_code_suggestions.aggregate(pipeline).to_list(10)
-        top_ticket_types = [{"type": item["_id"], "count": item["count"]} for item in ticket_types_result]
-        
-        # If no ticket summaries exist, return empty array instead of mock data
-        if not top_ticket_types:
-            top_ticket_types = []
-        
-        return AnalyticsData(
-            total_suggestions=total_suggestions,
-            successful_suggestions=successful_suggestions,
-            avg_confidence=avg_confidence * 100 if avg_confidence else 0,
-            avg_processing_time=avg_processing_time / 1000 if avg_processing_time else 0,  # Convert to seconds
-            total_merge_requests=total_merge_requests,
-            successful_merge_requests=successful_merge_requests,
-            usage_by_day=usage_by_day,
-            top_ticket_types=top_ticket_types
-        )
+    }}]
+    facets = (await db.advanced_code_suggestions.aggregate(pipeline).to_list(1))[0]
+    
+    totals = facets["totals"][0] if facets["totals"] else {}
+    counters = {
+        "total": totals.get("total", 0),
+        "successful": totals.get("successful", 0),
+        "conf_sum": totals.get("conf_sum", 0.0),
+        "time_sum": totals.get("time_sum", 0.0),
+        "by_day": {item["_id"]: item["count"] for item in facets["by_day"]},
+        "by_type": {item["_id"]: item["count"] for item in facets["by_type"]},
+        "rebuilt_at": datetime.utcnow()
+    }
+    return counters
+
+async def reconcile_analytics_counters():
+    """Periodically rebuild the counters so incremental updates can't drift from the source data"""
+    while True:
+        await asyncio.sleep(ANALYTICS_RECONCILE_INTERVAL)
+        try:
+            await rebuild_analytics_counters()
+            invalidate_analytics_cache()
+        except Exception as e:
+            logging.error(f"Analytics counter reconciliation failed: {str(e)}")
+
+async def compute_analytics() -> AnalyticsData:
+    """Build analytics and usage statistics from the rolling counters"""
+    counters = await db.analytics_counters.find_one({"_id": ANALYTICS_COUNTERS_ID})
+    if counters is None:
+        counters = await rebuild_analytics_counters()
+    
+    total_suggestions = counters.get("total", 0)
+    successful_suggestions = counters.get("successful", 0)
+    avg_confidence = counters.get("conf_sum", 0.0) / total_suggestions if total_suggestions else 0.0
+    avg_processing_time = counters.get("time_sum", 0.0) / total_suggestions if total_suggestions else 0.0
+    
+    # Usage by day (last 30 days); days since the last daily rebuild may still be in the counters
+    thirty_days_ago = (datetime.utcnow() - timedelta(days=ANALYTICS_USAGE_DAYS)).strftime("%Y-%m-%d")
+    usage_by_day = {day: count for day, count in sorted(counters.get("by_day", {}).items()) if day >= thirty_days_ago}
+    
+    # If no ticket summaries exist, this is an empty array instead of mock data
+    top_ticket_types = [
+        {"type": ticket_type, "count": count}
+        for ticket_type, count in sorted(counters.get("by_type", {}).items(), key=lambda item: item[1], reverse=True)[:10]
+    ]
+    
+    # Count merge requests by checking if we have any merge request records
+    # Since we don't have a separate MR collection, we'll use 0 for now
+    total_merge_requests = 0
+    successful_merge_requests = 0
+    
+    return AnalyticsData(
+        total_suggestions=total_suggestions,
+        successful_suggestions=successful_suggestions,
+        avg_confidence=avg_confidence * 100 if avg_confidence else 0,
+        avg_processing_time=avg_processing_time / 1000 if avg_processing_time else 0,  # Convert to seconds
+        total_merge_requests=total_merge_requests,
+        successful_merge_requests=successful_merge_requests,
+        usage_by_day=usage_by_day,
+        top_ticket_types=top_ticket_types
+    )
+    
+@api_router.get("/analytics", response_model=AnalyticsData)
+async def get_analytics(request: Request, response: Response):
+    """Get system analytics and usage statistics"""
+    try:
+        async with analytics_cache_lock:
+            if analytics_cache["value"] is None or time.monotonic() >= analytics_cache["expires"]:
+                analytics_cache["value"] = await compute_analytics()
+                analytics_cache["expires"] = time.monotonic() + ANALYTICS_CACHE_TTL
+            analytics = analytics_cache["value"]
         
     except Exception as e:
         logging.error(f"Analytics calculation failed: {str(e)}")
         return AnalyticsData()
+    
+    etag = '"' + hashlib.md5(orjson.dumps(analytics.dict(), option=orjson.OPT_SORT_KEYS)).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return analytics
 
 @api_router.get("/search/code")
 async def search_code(query: str, limit: int = 10):
     """Search code chunks by semantic similarity"""
     try:
         results = await semantic_code_search(query, limit)
-        return {
-            "query": query,
-            "results": [{
-                "file_path": result["chunk"]["file_path"],
-                "content": result["chunk"]["chunk_content"][:300] + "...",
+        out = []
+        for result in results:
+            chunk = result["chunk"]
+            content = chunk["chunk_content"]
+            out.append({
+                "file_path": chunk["file_path"],
+                "content": content[:300] + "..." if len(content) > 300 else content,
                 "similarity": result["similarity"],
-                "language": result["chunk"].get("language", "unknown"),
-                "function_name": result["chunk"].get("function_name"),
-                "complexity_score": result["chunk"].get("complexity_score", 1)
-            } for result in results]
-        }
+                "language": chunk.get("language", "unknown"),
+                "function_name": chunk.get("function_name"),
+                "complexity_score": chunk.get("complexity_score", 1)
+            })
+        # Plain dicts of JSON types; orjson encodes them directly without jsonable_encoder
+        return ORJSONResponse({"query": query, "results": out})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
 # Include the router in the main app
 app.include_router(api_router)
 
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["endpoint", "method"]
+)
+
+class PerfMiddleware(BaseHTTPMiddleware):
+    """Record request latency per route; P50/P95/P99 come from the histogram buckets"""
+    
+    async def dispatch(self, request: Request, call_next):
+        start_ns = time.perf_counter_ns()
+        response = await call_next(request)
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        # Label by route template so /status/{service} doesn't explode into one series per value
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_LATENCY.labels(endpoint=endpoint, method=request.method).observe(elapsed)
+        return response
+
+app.add_middleware(PerfMiddleware)
+
+# Prometheus scrape endpoint, served by the backend directly rather than through the /api proxy
+app.mount("/metrics", make_asgi_app())
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1130,10 +2361,51 @@ logger = logging.getLogger(__name__)
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    global http_client, analytics_reconcile_task
     logger.info("🚀 Advanced RAG Code Suggestion API starting up...")
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(15.0),
+        # Keep enough idle connections that OLLAMA, GitLab and JIRA traffic rarely needs a new handshake
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        http2=True
+    )
+    await migrate_service_config()
+    config = await get_config()
+    if config.postgres_password:
+        try:
+            await get_pg_pool(config)
+        except Exception as e:
+            logger.warning(f"Postgres pool not available at startup: {str(e)}")
+    await ensure_indexes()
+    # Seed the counters before any writes start incrementing them
+    if await db.analytics_counters.find_one({"_id": ANALYTICS_COUNTERS_ID}) is None:
+        await rebuild_analytics_counters()
+    suggestion_writer.start()
+    analytics_reconcile_task = asyncio.create_task(reconcile_analytics_counters())
     await init_sentence_model()
+    # Run one encode so the first request doesn't pay for tokenizer and kernel initialisation
+    with inference_context():
+        sentence_model.encode(["warmup"])
+    query_encoder.start()
+    # Map the vector sidecar and build the search matrix now rather than on the first search
+    try:
+        await load_search_index()
+    except Exception as e:
+        logger.warning(f"Search index not loaded at startup: {str(e)}")
     logger.info("✅ Startup completed")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if pending_writes:
+        await asyncio.gather(*pending_writes, return_exceptions=True)
+    await suggestion_writer.stop()
+    await query_encoder.stop()
+    if analytics_reconcile_task is not None:
+        analytics_reconcile_task.cancel()
+    if hnsw_build_task is not None:
+        hnsw_build_task.cancel()
+    if http_client is not None:
+        await http_client.aclose()
+    if pg_pool is not None:
+        await pg_pool.close()
     client.close()
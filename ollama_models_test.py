@@ -1,156 +1,242 @@
-import requests
-import json
+import asyncio
+import httpx
+import orjson
+import sys
 import time
-from datetime import datetime
+
+BASE_URL = "https://c624a4bd-9719-44d8-8b44-e52e7972801c.preview.emergentagent.com"
+
+# Gateway errors and failed connects are retried with exponential backoff instead of failing the run;
+# timeouts are not, since a slow LLM generation would only be repeated. A connection dropped mid-request
+# is only retried for idempotent methods: the server may already have handled a POST to suggest/code,
+# and replaying it would store a duplicate suggestion
+RETRY_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+# Fields every /api/ollama/models response must carry
+OLLAMA_MODELS_REQUIRED_FIELDS = frozenset({'status', 'models', 'ollama_url'})
 
 class OllamaModelsAPITester:
-    def __init__(self, base_url="https://c624a4bd-9719-44d8-8b44-e52e7972801c.preview.emergentagent.com"):
-        self.base_url = base_url
+    def __init__(self, client):
+        # One shared httpx.AsyncClient so every test reuses pooled connections; its base_url
+        # is the backend's /api/ root, so tests pass endpoints relative to it
+        self.client = client
+        # Configuration seen by this run; cleared whenever a test changes it
+        self.config_cache = None
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        # Output queued by log() and written once per test result, so concurrent tests don't interleave
+        self.output = []
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, params=None):
-        """Run a single API test"""
-        url = f"{self.base_url}/api/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
-        
+    async def run_test(self, name, method, endpoint, expected_status, data=None, params=None, capture_body=True):
+        """Run a single API test; with capture_body=False only the status line is awaited and the body is never downloaded"""
         self.tests_run += 1
-        print(f"\n🔍 Testing {name}...")
+        # Retry notes are kept with this test's result rather than written while other tests run
+        notes = []
         
         try:
-            start_time = time.time()
-            if method == 'GET':
-                response = requests.get(url, headers=headers, params=params)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers, params=params)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
-            
-            elapsed_time = time.time() - start_time
+            # Bodies are encoded with orjson; the client already sends Content-Type: application/json
+            body = orjson.dumps(data) if data is not None else None
+            request = self.client.build_request(method, endpoint, content=body, params=params)
+            # Only the final attempt is timed, so backoff sleeps don't show up as latency
+            response, retries, elapsed_ms = await self.send_with_retries(request, stream=not capture_body, notes=notes)
+            if not capture_body:
+                await response.aclose()
             
+            self.log(f"\n🔍 Testing {name}...")
+            for note in notes:
+                self.log(note)
             success = response.status_code == expected_status
+            result = {
+                "name": name,
+                "status": "PASS" if success else "FAIL",
+                "response_time": f"{elapsed_ms}ms",
+                "status_code": response.status_code,
+                "retries": retries
+            }
             if success:
                 self.tests_passed += 1
-                result = {
-                    "name": name,
-                    "status": "PASS",
-                    "response_time": f"{elapsed_time:.2f}s",
-                    "status_code": response.status_code
-                }
-                print(f"✅ Passed - Status: {response.status_code} - Time: {elapsed_time:.2f}s")
+                self.log(f"✅ Passed - Status: {response.status_code} - Time: {elapsed_ms}ms")
             else:
-                result = {
-                    "name": name,
-                    "status": "FAIL",
-                    "response_time": f"{elapsed_time:.2f}s",
-                    "status_code": response.status_code,
-                    "expected_status": expected_status
-                }
-                print(f"❌ Failed - Expected {expected_status}, got {response.status_code} - Time: {elapsed_time:.2f}s")
+                result["expected_status"] = expected_status
+                self.log(f"❌ Failed - Expected {expected_status}, got {response.status_code} - Time: {elapsed_ms}ms")
             
-            try:
-                result["response"] = response.json()
-            except:
-                result["response"] = response.text
+            # Parsed once here; callers get the decoded body back instead of re-parsing the response
+            parsed = None
+            if capture_body:
+                try:
+                    parsed = orjson.loads(response.content)
+                except:
+                    parsed = response.text
+                result["response"] = parsed
                 
             self.test_results.append(result)
-            return success, response
+            self.flush_output()
+            return success, parsed, response
         except Exception as e:
             self.test_results.append({
                 "name": name,
                 "status": "ERROR",
                 "error": str(e)
             })
-            print(f"❌ Error - {str(e)}")
-            return False, None
+            self.log(f"\n🔍 Testing {name}...")
+            for note in notes:
+                self.log(note)
+            self.log(f"❌ Error - {str(e)}")
+            self.flush_output()
+            return False, None, None
 
-    def test_get_config(self):
+    async def send_with_retries(self, request, stream=False, notes=None):
+        """Send a request, retrying transient failures; a numeric Retry-After header overrides the backoff.
+        Returns the response, the number of retries and the final attempt's time in milliseconds."""
+        if request.method in IDEMPOTENT_METHODS:
+            retryable_errors = (httpx.NetworkError, httpx.RemoteProtocolError)
+        else:
+            retryable_errors = (httpx.ConnectError,)
+        for attempt in range(MAX_RETRIES + 1):
+            delay = RETRY_BACKOFF * 2 ** attempt
+            start_ns = time.monotonic_ns()
+            try:
+                response = await self.client.send(request, stream=stream)
+            except retryable_errors:
+                if attempt == MAX_RETRIES:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    return response, attempt, (time.monotonic_ns() - start_ns) // 1_000_000
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), 30.0)
+                await response.aclose()
+            if notes is not None:
+                notes.append(f"⚠️ {request.method} {request.url.path} failed, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def test_get_config(self):
         """Test getting the current configuration"""
-        success, response = self.run_test(
+        success, config, _ = await self.run_test(
             "Get Configuration",
             "GET",
             "config",
             200
         )
         if success:
-            config = response.json()
-            print(f"Configuration retrieved: {json.dumps(config, indent=2)}")
+            self.config_cache = config
+            self.log(f"Configuration retrieved: {orjson.dumps(config, option=orjson.OPT_INDENT_2).decode()}")
             
             # Check if OLLAMA configuration is present
             if 'ollama_url' in config and 'ollama_model' in config:
-                print(f"✅ OLLAMA configuration found - URL: {config['ollama_url']}, Model: {config['ollama_model']}")
+                self.log(f"✅ OLLAMA configuration found - URL: {config['ollama_url']}, Model: {config['ollama_model']}")
                 return True, config
             else:
-                print("❌ OLLAMA configuration missing")
+                self.log("❌ OLLAMA configuration missing")
                 return False, None
         return False, None
 
-    def test_get_ollama_models(self):
+    async def test_get_ollama_models(self):
         """Test the new /api/ollama/models endpoint"""
-        success, response = self.run_test(
+        success, models_data, _ = await self.run_test(
             "Get OLLAMA Models",
             "GET",
             "ollama/models",
             200
         )
         if success:
-            models_data = response.json()
-            print(f"OLLAMA Models Response: {json.dumps(models_data, indent=2)}")
+            self.log(f"OLLAMA Models Response: {orjson.dumps(models_data, option=orjson.OPT_INDENT_2).decode()}")
             
             # Verify response structure
-            required_fields = ['status', 'models', 'ollama_url']
-            missing_fields = [field for field in required_fields if field not in models_data]
+            missing_fields = OLLAMA_MODELS_REQUIRED_FIELDS - models_data.keys()
             
             if missing_fields:
-                print(f"❌ Missing required fields in models response: {missing_fields}")
+                self.log(f"❌ Missing required fields in models response: {sorted(missing_fields)}")
                 return False
             else:
-                print("✅ All required fields present in models response")
+                self.log("✅ All required fields present in models response")
+            
+            # Read each field once; total_models is optional
+            status = models_data['status']
+            models = models_data['models']
+            total_models = models_data.get('total_models')
             
             # Check if models is a list
-            if not isinstance(models_data['models'], list):
-                print(f"❌ 'models' should be a list, got {type(models_data['models'])}")
+            if not isinstance(models, list):
+                self.log(f"❌ 'models' should be a list, got {type(models)}")
                 return False
             
-            # Check if total_models exists and is an integer
-            if 'total_models' in models_data:
-                if not isinstance(models_data['total_models'], int):
-                    print(f"❌ 'total_models' should be an integer, got {type(models_data['total_models'])}")
+            # Check if total_models exists, is an integer and matches the length of models list
+            if total_models is not None:
+                if not isinstance(total_models, int):
+                    self.log(f"❌ 'total_models' should be an integer, got {type(total_models)}")
                     return False
-            
-            # Check if total_models exists and matches the length of models list
-            if 'total_models' in models_data:
-                if models_data['total_models'] != len(models_data['models']):
-                    print(f"❌ 'total_models' ({models_data['total_models']}) doesn't match the length of 'models' list ({len(models_data['models'])})")
+                if total_models != len(models):
+                    self.log(f"❌ 'total_models' ({total_models}) doesn't match the length of 'models' list ({len(models)})")
                     return False
                 else:
-                    print(f"✅ 'total_models' correctly matches the length of 'models' list: {models_data['total_models']}")
+                    self.log(f"✅ 'total_models' correctly matches the length of 'models' list: {total_models}")
             else:
                 # If total_models is missing, calculate it from the models list
-                print(f"ℹ️ 'total_models' field is missing, but can be calculated from models list: {len(models_data['models'])}")
+                self.log(f"ℹ️ 'total_models' field is missing, but can be calculated from models list: {len(models)}")
             
             # Check if status is success
-            if models_data['status'] != 'success' and models_data['status'] != 'error':
-                print(f"❌ 'status' should be 'success' or 'error', got '{models_data['status']}'")
+            if status != 'success' and status != 'error':
+                self.log(f"❌ 'status' should be 'success' or 'error', got '{status}'")
                 return False
             
             # If status is error, check if fallback models are provided
-            if models_data['status'] == 'error':
-                if not models_data['models'] or len(models_data['models']) == 0:
-                    print("❌ No fallback models provided when status is 'error'")
+            if status == 'error':
+                if not models:
+                    self.log("❌ No fallback models provided when status is 'error'")
                     return False
                 else:
-                    print(f"✅ Fallback models provided when status is 'error': {models_data['models']}")
+                    self.log(f"✅ Fallback models provided when status is 'error': {models}")
             
             return True
         return False
 
-    def test_suggest_code_with_default_model(self, ticket_id):
+    async def get_config(self, force=False):
+        """Return the configuration, fetching it only when this run hasn't seen it yet"""
+        if force or self.config_cache is None:
+            success, config, _ = await self.run_test(
+                "Get Configuration for Model Verification",
+                "GET",
+                "config",
+                200
+            )
+            self.config_cache = config if success else {}
+        return self.config_cache
+
+    def check_model_used(self, suggestion, expected, mode="exact", label="Requested"):
+        """Validate suggestion['model_used']: mode 'exact' requires the expected model, while mode 'not'
+        expects a fallback and only warns if the expected (invalid) model was used. With no expected
+        model only the field's presence is checked."""
+        self.log(f"Code Suggestion for {suggestion['ticket_id']} - Confidence: {suggestion['confidence_score']}")
+        
+        # Check if model_used field is present
+        model_used = suggestion.get('model_used')
+        if model_used is None:
+            self.log("❌ 'model_used' field missing in response")
+            return False
+        if expected is None:
+            return True
+        
+        if mode == "exact":
+            if model_used != expected:
+                self.log(f"❌ Expected {label.lower()} model '{expected}', but got '{model_used}'")
+                return False
+            self.log(f"✅ {label} model '{expected}' was used as expected")
+        elif model_used == expected:
+            # This is not ideal behavior, but the API is still working
+            self.log(f"⚠️ Invalid model '{expected}' was used instead of falling back to default model")
+        else:
+            self.log(f"✅ Fallback model '{model_used}' was used instead of invalid model '{expected}'")
+        return True
+
+    async def test_suggest_code_with_default_model(self, ticket_id):
         """Test code suggestion with default model"""
-        success, response = self.run_test(
+        success, suggestion, _ = await self.run_test(
             "Generate Code Suggestion with Default Model",
             "POST",
             "suggest/code",
@@ -158,39 +244,15 @@ class OllamaModelsAPITester:
             data={"ticket_id": ticket_id}
         )
         if success:
-            suggestion = response.json()
-            print(f"Code Suggestion for {suggestion['ticket_id']} - Confidence: {suggestion['confidence_score']}")
-            
-            # Check if model_used field is present
-            if 'model_used' not in suggestion:
-                print("❌ 'model_used' field missing in response")
-                return False
-            
             # Get config to verify default model
-            _, config_response = self.run_test(
-                "Get Configuration for Model Verification",
-                "GET",
-                "config",
-                200
-            )
-            
-            if config_response:
-                config = config_response.json()
-                default_model = config.get('ollama_model', 'codellama')
-                
-                # Check if model_used matches default model
-                if suggestion['model_used'] == default_model:
-                    print(f"✅ Default model '{default_model}' was used as expected")
-                else:
-                    print(f"❌ Expected default model '{default_model}', but got '{suggestion['model_used']}'")
-                    return False
-            
-            return True
+            config = await self.get_config()
+            default_model = config.get('ollama_model', 'codellama') if config else None
+            return self.check_model_used(suggestion, default_model, label="Default")
         return False
 
-    def test_suggest_code_with_specific_model(self, ticket_id, model):
+    async def test_suggest_code_with_specific_model(self, ticket_id, model):
         """Test code suggestion with specific model"""
-        success, response = self.run_test(
+        success, suggestion, _ = await self.run_test(
             f"Generate Code Suggestion with Specific Model ({model})",
             "POST",
             "suggest/code",
@@ -198,27 +260,12 @@ class OllamaModelsAPITester:
             data={"ticket_id": ticket_id, "model": model}
         )
         if success:
-            suggestion = response.json()
-            print(f"Code Suggestion for {suggestion['ticket_id']} - Confidence: {suggestion['confidence_score']}")
-            
-            # Check if model_used field is present
-            if 'model_used' not in suggestion:
-                print("❌ 'model_used' field missing in response")
-                return False
-            
-            # Check if model_used matches requested model
-            if suggestion['model_used'] == model:
-                print(f"✅ Requested model '{model}' was used as expected")
-            else:
-                print(f"❌ Expected model '{model}', but got '{suggestion['model_used']}'")
-                return False
-            
-            return True
+            return self.check_model_used(suggestion, model)
         return False
 
-    def test_suggest_code_with_invalid_model(self, ticket_id, invalid_model):
+    async def test_suggest_code_with_invalid_model(self, ticket_id, invalid_model):
         """Test code suggestion with invalid model name"""
-        success, response = self.run_test(
+        success, suggestion, _ = await self.run_test(
             f"Generate Code Suggestion with Invalid Model ({invalid_model})",
             "POST",
             "suggest/code",
@@ -226,41 +273,28 @@ class OllamaModelsAPITester:
             data={"ticket_id": ticket_id, "model": invalid_model}
         )
         if success:
-            suggestion = response.json()
-            print(f"Code Suggestion for {suggestion['ticket_id']} - Confidence: {suggestion['confidence_score']}")
-            
-            # Check if model_used field is present
-            if 'model_used' not in suggestion:
-                print("❌ 'model_used' field missing in response")
-                return False
-            
-            # Check if model_used is NOT the invalid model (should use fallback)
-            if suggestion['model_used'] == invalid_model:
-                print(f"⚠️ Invalid model '{invalid_model}' was used instead of falling back to default model")
-                # This is not ideal behavior, but the API is still working
-                return True
-            else:
-                print(f"✅ Fallback model '{suggestion['model_used']}' was used instead of invalid model '{invalid_model}'")
-            
-            return True
+            # model_used should NOT be the invalid model (the API should fall back)
+            return self.check_model_used(suggestion, invalid_model, mode="not")
         return False
 
-    def test_ollama_models_connection_error(self):
+    async def test_ollama_models_connection_error(self):
         """Test OLLAMA models endpoint with connection error"""
         # First update config with invalid OLLAMA URL
         invalid_config = {
             "ollama_url": "http://invalid-ollama-url:11434"
         }
-        self.run_test(
+        await self.run_test(
             "Update Config with Invalid OLLAMA URL",
             "POST",
             "config",
             200,
-            data=invalid_config
+            data=invalid_config,
+            capture_body=False
         )
+        self.config_cache = None
         
         # Then check OLLAMA models endpoint to see fallback behavior
-        success, response = self.run_test(
+        success, models_data, _ = await self.run_test(
             "Check OLLAMA Models with Invalid URL",
             "GET",
             "ollama/models",
@@ -268,80 +302,105 @@ class OllamaModelsAPITester:
         )
         
         if success:
-            models_data = response.json()
-            print(f"OLLAMA Models Response with Invalid URL: {json.dumps(models_data, indent=2)}")
+            self.log(f"OLLAMA Models Response with Invalid URL: {orjson.dumps(models_data, option=orjson.OPT_INDENT_2).decode()}")
             
             # Check if status is error
             if models_data['status'] != 'error':
-                print(f"❌ Expected 'status' to be 'error', got '{models_data['status']}'")
+                self.log(f"❌ Expected 'status' to be 'error', got '{models_data['status']}'")
                 return False
             else:
-                print("✅ Correctly reported error status with invalid OLLAMA URL")
+                self.log("✅ Correctly reported error status with invalid OLLAMA URL")
             
             # Check if fallback models are provided
             if not models_data['models'] or len(models_data['models']) == 0:
-                print("❌ No fallback models provided when connection failed")
+                self.log("❌ No fallback models provided when connection failed")
                 return False
             else:
-                print(f"✅ Fallback models provided when connection failed: {models_data['models']}")
+                self.log(f"✅ Fallback models provided when connection failed: {models_data['models']}")
             
             # Reset config to valid URL
             valid_config = {
                 "ollama_url": "http://localhost:11434"
             }
-            self.run_test(
+            await self.run_test(
                 "Reset Config to Valid OLLAMA URL",
                 "POST",
                 "config",
                 200,
-                data=valid_config
+                data=valid_config,
+                capture_body=False
             )
+            self.config_cache = None
             
             return True
         return False
 
+    def log(self, message=""):
+        """Queue a line of output; queued lines are written together at the next flush"""
+        self.output.append(message)
+    
+    def flush_output(self):
+        """Write queued output in one call so concurrent tests don't interleave mid-test"""
+        if self.output:
+            sys.stdout.write("\n".join(self.output) + "\n")
+            self.output.clear()
+    
     def print_summary(self):
-        """Print test summary"""
-        print("\n" + "="*50)
-        print(f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
-        print("="*50)
+        """Print test summary with a single write"""
+        self.flush_output()
+        lines = [
+            "\n" + "="*50,
+            f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed",
+            "="*50
+        ]
         
         for i, result in enumerate(self.test_results):
             status_icon = "✅" if result["status"] == "PASS" else "❌"
-            print(f"{i+1}. {status_icon} {result['name']} - {result['status']}")
+            lines.append(f"{i+1}. {status_icon} {result['name']} - {result['status']}")
         
-        print("="*50)
+        lines.append("="*50)
         
         if self.tests_passed == self.tests_run:
-            print("🎉 All tests passed!")
+            lines.append("🎉 All tests passed!")
         else:
-            print(f"❌ {self.tests_run - self.tests_passed} tests failed")
+            lines.append(f"❌ {self.tests_run - self.tests_passed} tests failed")
+        sys.stdout.write("\n".join(lines) + "\n")
 
-def main():
-    tester = OllamaModelsAPITester()
-    
-    # Test configuration endpoint
-    success, config = tester.test_get_config()
-    
-    # Test OLLAMA models endpoint
-    tester.test_get_ollama_models()
-    
-    # Test code suggestion with default model
-    test_ticket_id = "TEST-123"
-    tester.test_suggest_code_with_default_model(test_ticket_id)
-    
-    # Test code suggestion with specific model
-    # Use a model that should be available in OLLAMA
-    tester.test_suggest_code_with_specific_model(test_ticket_id, "codellama")
-    
-    # Test code suggestion with invalid model
-    tester.test_suggest_code_with_invalid_model(test_ticket_id, "non_existent_model")
-    
-    # Test OLLAMA models endpoint with connection error
-    tester.test_ollama_models_connection_error()
-    
-    # Print summary
-    tester.print_summary()
+async def main(base_url=BASE_URL):
+    # Keep-alive pool shared by every test; connect failures are retried, and the long read timeout covers LLM generation.
+    # HTTP/2 lets the concurrent suggest/code requests share one TLS connection as parallel streams
+    # (the pool settings live on the transport, since httpx ignores client-level ones once a transport is given)
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        retries=2
+    )
+    async with httpx.AsyncClient(
+        base_url=f"{base_url.rstrip('/')}/api/",
+        headers={'Content-Type': 'application/json'},
+        timeout=httpx.Timeout(60, connect=3),
+        transport=transport
+    ) as client:
+        tester = OllamaModelsAPITester(client)
+        
+        # Test configuration endpoint; the tester keeps the result for the default model check
+        await tester.test_get_config()
+        
+        # The model listing and suggestion checks only read config, so they run concurrently
+        test_ticket_id = "TEST-123"
+        await asyncio.gather(
+            tester.test_get_ollama_models(),
+            tester.test_suggest_code_with_default_model(test_ticket_id),
+            # Use a model that should be available in OLLAMA
+            tester.test_suggest_code_with_specific_model(test_ticket_id, "codellama"),
+            tester.test_suggest_code_with_invalid_model(test_ticket_id, "non_existent_model")
+        )
+        
+        # Test OLLAMA models endpoint with connection error; runs alone since it rewrites the config
+        await tester.test_ollama_models_connection_error()
+        
+        # Print summary
+        tester.print_summary()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+import server
+
+def random_codes(rows, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    return server.binary_codes(rng.normal(size=(rows, dim)).astype(np.float32))
+
+def reference_distances(codes, query_code):
+    xor = (codes ^ query_code).view(np.uint8)
+    return np.unpackbits(xor, axis=1).sum(axis=1)
+
+@pytest.mark.skipif(server.njit is None, reason="numba not installed")
+def test_kernel_matches_numpy():
+    codes = random_codes(257, 384)
+    query_code = random_codes(1, 384, seed=1)[0]
+    assert codes.dtype == np.uint64
+    kernel = server.hamming_kernel(codes, query_code)
+    xor = codes ^ query_code
+    if hasattr(np, "bitwise_count"):
+        numpy_path = np.bitwise_count(xor).sum(axis=1, dtype=np.uint32)
+    else:
+        numpy_path = server.POPCOUNT_TABLE[xor.view(np.uint8)].sum(axis=1, dtype=np.uint32)
+    np.testing.assert_array_equal(kernel, numpy_path)
+    np.testing.assert_array_equal(kernel, reference_distances(codes, query_code))
+
+def test_distances_for_byte_codes():
+    # Widths that aren't a multiple of 64 bits stay uint8 and take the NumPy path
+    codes = random_codes(33, 20)
+    query_code = random_codes(1, 20, seed=1)[0]
+    assert codes.dtype == np.uint8
+    np.testing.assert_array_equal(server.hamming_distances(codes, query_code), reference_distances(codes, query_code))
+
+def test_identical_and_opposite_codes():
+    vectors = np.random.default_rng(2).normal(size=(1, 128)).astype(np.float32)
+    codes = server.binary_codes(np.concatenate([vectors, -vectors]))
+    distances = server.hamming_distances(codes, codes[0])
+    assert distances.tolist() == [0, 128]
@@ -0,0 +1,42 @@
+import re
+
+from ingest_worker import chunk_by_tokens, extract_code_features
+
+class WordTokenizer:
+    """Stands in for the HF fast tokenizer: one token per word or punctuation mark, with offsets"""
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False, verbose=True):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\w+|[^\w\s]", text)]}
+
+def test_chunk_by_tokens_windows_overlap():
+    content = " ".join(f"w{i}" for i in range(10))
+    chunks = chunk_by_tokens(content, WordTokenizer(), 4, 1)
+    assert chunks == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+
+def test_chunk_by_tokens_keeps_original_formatting():
+    content = "def f(x):\n    return x\n"
+    chunks = chunk_by_tokens(content, WordTokenizer(), 100, 10)
+    # One window covering everything, cut from the source text rather than rebuilt from tokens
+    assert chunks == ["def f(x):\n    return x"]
+
+def test_chunk_by_tokens_stops_at_last_full_window():
+    content = " ".join(f"w{i}" for i in range(6))
+    chunks = chunk_by_tokens(content, WordTokenizer(), 4, 2)
+    # The second window already reaches the end, so no trailing window of overlap-only tokens
+    assert chunks == ["w0 w1 w2 w3", "w2 w3 w4 w5"]
+
+def test_chunk_by_tokens_overlap_not_smaller_than_window():
+    content = "a b c"
+    assert chunk_by_tokens(content, WordTokenizer(), 2, 5) == ["a b", "b c"]
+
+def test_chunk_by_tokens_empty_content():
+    assert chunk_by_tokens("", WordTokenizer(), 4, 1) == []
+    assert chunk_by_tokens("   \n", WordTokenizer(), 4, 1) == []
+
+def test_extract_code_features_python():
+    features = extract_code_features("import os\nclass A:\n    def f(self):\n        if os:\n            pass\n", "pkg/a.py")
+    assert features["language"] == "python"
+    assert features["class_name"] == "A"
+    assert features["function_name"] == "f"
+    assert features["imports"] == ["os"]
+    assert features["complexity_score"] == 2
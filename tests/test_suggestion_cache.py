@@ -0,0 +1,76 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+import server
+
+def unit_vectors(count, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(server.time, "monotonic", clock)
+    return clock
+
+def test_hit_needs_same_model_and_close_query(clock):
+    async def scenario():
+        cache = server.SemanticSuggestionCache(max_size=4, ttl=100)
+        vectors = unit_vectors(2)
+        await cache.put(vectors[0], "codellama", "a")
+        return (
+            await cache.get(vectors[0], "codellama"),
+            await cache.get(vectors[0], "llama3"),
+            await cache.get(vectors[1], "codellama"),
+        )
+    assert asyncio.run(scenario()) == ("a", None, None)
+
+def test_entries_expire_after_ttl(clock):
+    async def scenario():
+        cache = server.SemanticSuggestionCache(max_size=4, ttl=100)
+        vector = unit_vectors(1)[0]
+        await cache.put(vector, "m", "a")
+        clock.now += 99
+        fresh = await cache.get(vector, "m")
+        clock.now += 2
+        return fresh, await cache.get(vector, "m")
+    assert asyncio.run(scenario()) == ("a", None)
+
+def test_full_cache_evicts_least_recently_used(clock):
+    async def scenario():
+        cache = server.SemanticSuggestionCache(max_size=3, ttl=100)
+        vectors = unit_vectors(4)
+        for i in range(3):
+            clock.now += 1
+            await cache.put(vectors[i], "m", i)
+        # Entry 0 is used again, so 1 is now the least recently used
+        clock.now += 1
+        await cache.get(vectors[0], "m")
+        clock.now += 1
+        await cache.put(vectors[3], "m", 3)
+        return cache.size, [await cache.get(vector, "m") for vector in vectors]
+    assert asyncio.run(scenario()) == (3, [0, None, 2, 3])
+
+def test_full_cache_replaces_expired_entry_first(clock):
+    async def scenario():
+        cache = server.SemanticSuggestionCache(max_size=2, ttl=10)
+        vectors = unit_vectors(3)
+        await cache.put(vectors[0], "m", 0)
+        clock.now += 8
+        await cache.put(vectors[1], "m", 1)
+        # Entry 0 has expired; it goes even though entry 1 is older by last use
+        clock.now += 5
+        await cache.get(vectors[1], "m")
+        await cache.put(vectors[2], "m", 2)
+        return [await cache.get(vector, "m") for vector in vectors]
+    assert asyncio.run(scenario()) == [None, 1, 2]
@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+import server
+
+DIM = 4
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for doc in self.docs:
+            yield doc
+
+class FakeChunkCollection:
+    """Just the code_chunks queries load_search_index makes"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        if "id" in query:
+            docs = [doc for doc in self.docs if doc["id"] in query["id"]["$in"]]
+        else:
+            docs = [doc for doc in self.docs if doc.get("embedding") is not None]
+        if projection == {"embedding": 0}:
+            docs = [{key: value for key, value in doc.items() if key != "embedding"} for doc in docs]
+        else:
+            docs = [dict(doc) for doc in docs]
+        return FakeCursor(docs)
+
+@pytest.fixture(autouse=True)
+def vector_store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "VECTOR_STORE_DIR", tmp_path)
+    return tmp_path
+
+def unit_rows(count, seed=0):
+    rows = np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+def test_append_and_reopen():
+    first, second = unit_rows(3), unit_rows(2, seed=1)
+    start, store_id = asyncio.run(server.append_chunk_vectors(first))
+    assert start == 0
+    next_start, next_id = asyncio.run(server.append_chunk_vectors(second))
+    assert (next_start, next_id) == (3, store_id)
+
+    reopened_id, store = server.open_vector_store(DIM)
+    assert reopened_id == store_id
+    assert store.shape == (5, DIM)
+    np.testing.assert_array_equal(store, np.concatenate([first, second]).astype(np.float16))
+
+def test_missing_store():
+    assert server.open_vector_store(DIM) is None
+
+def test_recreated_store_gets_new_generation():
+    _, old_id = asyncio.run(server.append_chunk_vectors(unit_rows(2)))
+    server.vector_store_path(DIM).unlink()
+    start, new_id = asyncio.run(server.append_chunk_vectors(unit_rows(2, seed=1)))
+    assert start == 0
+    assert new_id != old_id
+
+def test_truncated_last_row():
+    asyncio.run(server.append_chunk_vectors(unit_rows(2)))
+    path = server.vector_store_path(DIM)
+    # An interrupted append: half a row, and an odd number of bytes
+    with open(path, 'ab') as f:
+        f.write(b"\x00" * (DIM + 1))
+    _, store = server.open_vector_store(DIM)
+    assert len(store) == 2
+
+    # The next append starts past the torn row instead of splicing into it
+    appended = unit_rows(1, seed=2)
+    start, _ = asyncio.run(server.append_chunk_vectors(appended))
+    assert start == 3
+    _, store = server.open_vector_store(DIM)
+    np.testing.assert_array_equal(store[3], appended[0].astype(np.float16))
+
+def test_search_index_falls_back_to_mongodb_for_other_generations(monkeypatch):
+    sidecar_rows = unit_rows(2)
+    _, old_id = asyncio.run(server.append_chunk_vectors(sidecar_rows))
+    # The sidecar is lost and recreated; its new rows don't belong to the existing chunks
+    server.vector_store_path(DIM).unlink()
+    _, new_id = asyncio.run(server.append_chunk_vectors(unit_rows(3, seed=1)))
+
+    mongo_rows = unit_rows(2, seed=2)
+    docs = [
+        # Stored against the old generation: served from its MongoDB embedding
+        {"id": "stale", "embedding": server.encode_embedding(mongo_rows[0]), "vector_row": 0, "vector_store_id": old_id},
+        # Stored against the current file: served from the sidecar
+        {"id": "current", "embedding": server.encode_embedding(mongo_rows[1]), "vector_row": 2, "vector_store_id": new_id},
+    ]
+    monkeypatch.setattr(server, "db", SimpleNamespace(code_chunks=FakeChunkCollection(docs)))
+    monkeypatch.setattr(server, "sentence_model", SimpleNamespace(get_sentence_embedding_dimension=lambda: DIM))
+    monkeypatch.setattr(server, "search_index", dict(server.search_index, version=None))
+
+    index = asyncio.run(server.load_search_index())
+    rows = {chunk["id"]: row for chunk, row in zip(index["chunks"], index["matrix"])}
+    _, store = server.open_vector_store(DIM)
+    np.testing.assert_allclose(rows["current"], store[2].astype(np.float32), atol=1e-3)
+    np.testing.assert_allclose(rows["stale"], mongo_rows[0], atol=1e-3)